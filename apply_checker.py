@@ -5,22 +5,59 @@
 3. 가격조정 청구서 재발송 (파기 후 재발송)
 """
 
-import gspread
-from google.oauth2.service_account import Credentials
-from dataclasses import dataclass
-from typing import List
+# gspread/google-auth는 구글 시트 접속이 필요할 때만 로드 (google_client 참고)
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple, Union
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from urllib.parse import urlsplit, parse_qs
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 import time
 import logging
 import os
+import sys
 import hashlib
+import hmac
 import json
+import re
+import sqlite3
+import string
+from functools import lru_cache, partial
+import cProfile
+import pstats
+import io
+from contextlib import contextmanager
+import atexit
+import copy
+import signal
+import threading
+import queue
+import asyncio
+try:
+    import fcntl  # 프로세스 간 파일 잠금 (Windows에는 없음 → 스레드 잠금만)
+except ImportError:
+    fcntl = None
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 
 # 스크립트 위치 기준 경로 설정
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CREDENTIALS_PATH = os.path.join(SCRIPT_DIR, "notice.json")
 LOG_PATH = os.path.join(SCRIPT_DIR, "sms_apply.log")
+ROW_STATE_PATH = os.path.join(SCRIPT_DIR, "row_state.json")
+JOURNAL_PATH = os.path.join(SCRIPT_DIR, "outbox.db")
+PROFILE_DIR = os.path.join(SCRIPT_DIR, "profiles")
+STATE_DIR = os.path.join(SCRIPT_DIR, "state")  # 여러 시트 동시 실행 시 대상별 행 상태/저널/지표
+BILL_SEQ_PATH = os.path.join(SCRIPT_DIR, "bill_seq.json")  # bill_id 일련번호 카운터
+GOOGLE_CACHE_PATH = os.environ.get("GOOGLE_CACHE_PATH", os.path.join(SCRIPT_DIR, ".google_cache.json"))  # 토큰/워크시트 정보 캐시 (빈 값이면 끔)
+TARGETS_PATH = os.environ.get("TARGETS_PATH", os.path.join(SCRIPT_DIR, "targets.json"))  # 여러 시트 동시 실행 대상 목록
+TEMPLATES_PATH = os.environ.get("TEMPLATES_PATH", os.path.join(SCRIPT_DIR, "templates.json"))  # 문자/청구서 문구
+METRICS_PATH = os.environ.get("METRICS_PATH", os.path.join(SCRIPT_DIR, "metrics.jsonl"))  # 사이클 지표 JSON lines (빈 값이면 끔)
+METRICS_PROM_PATH = os.environ.get("METRICS_PROM_PATH", "")  # Prometheus 텍스트 파일 (node_exporter textfile용, 빈 값이면 끔)
+METRICS_MAX_BYTES = int(os.environ.get("METRICS_MAX_BYTES", str(10 * 1024 * 1024)))  # 지표 파일이 이 크기를 넘으면 .1로 돌림 (0이면 안 돌림)
+METRICS_BACKUPS = int(os.environ.get("METRICS_BACKUPS", "5"))  # 돌린 지표 파일 보관 개수 (.1 ~ .N)
 
 # 환경변수에서 설정 로드 (없으면 기본값 사용)
 ALIGO_API_KEY = os.environ.get("ALIGO_API_KEY", "v7zkfq6h1oi67mafv7s9wvkmiicm2e3k")
@@ -29,7 +66,30 @@ ALIGO_SENDER = os.environ.get("ALIGO_SENDER", "01084431621")
 PAYSSAM_API_KEY = os.environ.get("PAYSSAM_API_KEY", "DLTQLDSNWYRRKQBB")
 PAYSSAM_MEMBER = os.environ.get("PAYSSAM_MEMBER", "parkkyojoon0001")
 PAYSSAM_MERCHANT = os.environ.get("PAYSSAM_MERCHANT", "parkkyojoon0001")
+PAYSSAM_CALLBACK_URL = os.environ.get("PAYSSAM_CALLBACK_URL", "https://example.com/callback")  # 결제 결과 통보 주소 (serve 모드의 /payssam/callback, TRIGGER_TOKEN 설정 시 ?token= 포함)
 GOOGLE_SHEET_ID = os.environ.get("GOOGLE_SHEET_ID", "1jzwafX-L-QatwQUxlv5VnLqYZIZB3GQjRKmTEUp2L3g")
+ALIGO_RATE_LIMIT = float(os.environ.get("ALIGO_RATE_LIMIT", "5"))  # 알리고 초당 발송 요청 수 (시작값)
+ALIGO_RATE_MAX = float(os.environ.get("ALIGO_RATE_MAX", "20"))     # 429 없이 성공이 이어질 때 올라갈 수 있는 최대값
+PAYSSAM_RATE_LIMIT = float(os.environ.get("PAYSSAM_RATE_LIMIT", "5"))  # 결제선생 초당 요청 수 (시작값)
+PAYSSAM_RATE_MAX = float(os.environ.get("PAYSSAM_RATE_MAX", "20"))
+SHEETS_RATE_LIMIT = float(os.environ.get("SHEETS_RATE_LIMIT", "1"))  # 구글 시트 초당 요청 수 (기본 할당량 분당 60회)
+SEND_WORKERS = int(os.environ.get("SEND_WORKERS", "8"))  # 동시 발송 스레드 수
+TARGET_WORKERS = int(os.environ.get("TARGET_WORKERS", "4"))  # 여러 시트 동시 실행 시 동시에 처리할 시트 수
+ALIGO_CONCURRENCY = int(os.environ.get("ALIGO_CONCURRENCY", str(SEND_WORKERS)))      # 알리고 동시 요청 수
+PAYSSAM_CONCURRENCY = int(os.environ.get("PAYSSAM_CONCURRENCY", str(SEND_WORKERS)))  # 결제선생 동시 요청 수
+SHEETS_CONCURRENCY = int(os.environ.get("SHEETS_CONCURRENCY", "2"))                 # 구글 시트 동시 요청 수
+IO_THREADS = int(os.environ.get("IO_THREADS", str(max(16, SEND_WORKERS * 3))))       # 블로킹 HTTP/시트 호출용 공용 스레드 수
+SERVE_HOST = os.environ.get("SERVE_HOST", "127.0.0.1")   # 웹훅 수신 주소 (외부 공개 시 0.0.0.0 + TRIGGER_TOKEN)
+SERVE_PORT = int(os.environ.get("SERVE_PORT", "8080"))
+TRIGGER_TOKEN = os.environ.get("TRIGGER_TOKEN", "")       # 설정 시 X-Trigger-Token 헤더 또는 ?token= 필수
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))   # 연결 타임아웃(초)
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))        # 응답 타임아웃(초)
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "3"))                     # 재시도 횟수
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", str(max(10, SEND_WORKERS))))  # 호스트별 연결 수
+SHEET_WRITE_BATCH = int(os.environ.get("SHEET_WRITE_BATCH", "100"))  # 모아서 기록할 최대 셀 수
+SHEET_CHUNK_ROWS = int(os.environ.get("SHEET_CHUNK_ROWS", "5000"))  # 사이클에서 시트를 나눠 읽을 행 수 (0이면 한 번에 전체)
+BILL_ID_BLOCK = int(os.environ.get("BILL_ID_BLOCK", "100"))  # bill_id 일련번호를 한 번에 예약할 개수
+FULL_CHECK_INTERVAL = float(os.environ.get("FULL_CHECK_INTERVAL", "600"))  # 시트 수정이 없어도 이 간격(초)마다는 전체 확인
 
 # 로그 설정
 logging.basicConfig(
@@ -43,6 +103,387 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+####---------- 속도 제한 ----------####
+
+class AdaptiveRateLimiter:
+    """토큰 버킷 + AIMD 초당 요청 수 제한 (스레드 안전)
+    
+    - 성공할 때마다 rate를 조금씩 올림 (초당 약 increase씩, max_rate까지)
+    - 429(할당량 초과) 응답 시 rate 절반으로 + Retry-After 동안 전체 정지
+    """
+    
+    def __init__(self, rate: float, max_rate: float = None, burst: int = None, min_rate: float = None,
+                 increase: float = 1.0):
+        self.rate = rate
+        self.max_rate = max(rate, max_rate or rate)
+        self.min_rate = min_rate or min(rate, 0.2)
+        self.increase = increase
+        self.capacity = burst or max(1, int(rate))
+        self.throttles = 0
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+    
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+    
+    def on_throttle(self, retry_after: float = None):
+        with self._lock:
+            now = time.monotonic()
+            self.throttles += 1
+            # 동시에 몰려온 429는 한 번만 감속
+            if now - self._last_decrease >= 1.0:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._last_decrease = now
+            self._tokens = 0.0
+            self._updated = now
+            self._paused_until = max(self._paused_until, now + (retry_after if retry_after else 1 / self.rate))
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"rate": round(self.rate, 3), "max_rate": self.max_rate, "throttles": self.throttles}
+
+
+class RateGovernor:
+    """백엔드별(구글 시트, 알리고, 결제선생) 속도 제한 모음 - API 호출은 모두 여기를 거침"""
+    
+    # 백엔드: (시작 rate, 최대 rate, burst)
+    DEFAULT_LIMITS = {
+        "sheets": (SHEETS_RATE_LIMIT, SHEETS_RATE_LIMIT, 10),
+        "aligo": (ALIGO_RATE_LIMIT, ALIGO_RATE_MAX, None),
+        "payssam": (PAYSSAM_RATE_LIMIT, PAYSSAM_RATE_MAX, None),
+    }
+    
+    def __init__(self, limits: dict = None):
+        self.limiters = {
+            backend: AdaptiveRateLimiter(rate, max_rate, burst)
+            for backend, (rate, max_rate, burst) in {**self.DEFAULT_LIMITS, **(limits or {})}.items()
+        }
+    
+    def __getitem__(self, backend: str) -> AdaptiveRateLimiter:
+        return self.limiters[backend]
+    
+    def snapshot(self) -> dict:
+        return {backend: limiter.snapshot() for backend, limiter in self.limiters.items()}
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Retry-After 헤더 (초 또는 HTTP 날짜) → 대기 초"""
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+####---------- 호출 통계 ----------####
+
+class CallStats:
+    """엔드포인트별 호출 수/오류/재시도/지연시간(히스토그램) 누적 (스레드 안전)"""
+    
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # 지연시간 히스토그램 상한(초)
+    
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+    
+    def record(self, endpoint: str, elapsed: float, error: bool = False, retry: bool = False):
+        with self._lock:
+            stat = self._stats.get(endpoint)
+            if stat is None:
+                stat = self._stats[endpoint] = {"count": 0, "errors": 0, "retries": 0, "total": 0.0, "max": 0.0,
+                                                "buckets": [0] * (len(self.BUCKETS) + 1)}
+            stat["count"] += 1
+            stat["errors"] += int(error)
+            stat["retries"] += int(retry)
+            stat["total"] += elapsed
+            stat["max"] = max(stat["max"], elapsed)
+            stat["buckets"][next((i for i, le in enumerate(self.BUCKETS) if elapsed <= le), len(self.BUCKETS))] += 1
+    
+    def take(self) -> dict:
+        """누적 통계 반환 후 초기화"""
+        with self._lock:
+            stats, self._stats = self._stats, {}
+        return stats
+
+
+def log_call_stats(stats: dict):
+    for endpoint, stat in sorted(stats.items()):
+        avg_ms = stat["total"] / stat["count"] * 1000
+        logger.info(f"  [API] {endpoint} {stat['count']}회 (오류 {stat['errors']}, 재시도 {stat['retries']}) "
+                    f"평균 {avg_ms:.0f}ms / 최대 {stat['max'] * 1000:.0f}ms")
+
+
+####---------- HTTP 전송 ----------####
+
+class HttpTransport:
+    """호스트별 keep-alive 세션 공유 + 연결/응답 타임아웃 + 재시도 + 호출별 지연시간 기록 + 속도 제한 연동"""
+    
+    RETRY_STATUS = (500, 502, 503, 504)
+    THROTTLE_STATUS = (429,)
+    
+    def __init__(self, connect_timeout: float = HTTP_CONNECT_TIMEOUT, read_timeout: float = HTTP_READ_TIMEOUT,
+                 retries: int = HTTP_RETRIES, backoff: float = 0.5, pool_size: int = HTTP_POOL_SIZE):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._sessions = {}
+        self.stats = CallStats()  # "host/path" 별
+        self._lock = threading.Lock()
+    
+    def _session(self, host: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+            return session
+    
+    def scoped(self) -> "HttpTransport":
+        """세션(연결 풀)은 공유하고 호출 통계만 따로 쌓는 사본 (여러 시트 동시 실행 시 대상별 지표)"""
+        view = copy.copy(self)
+        view.stats = CallStats()
+        return view
+    
+    @staticmethod
+    def _not_sent(error: Exception) -> bool:
+        """요청이 서버에 도달하지 않은 오류 (비멱등 요청도 재시도 가능)"""
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        # 연결 실패/DNS 실패(NameResolutionError도 하위 클래스)
+        return isinstance(reason, NewConnectionError)
+    
+    def post(self, url: str, idempotent: bool = False, limiter: AdaptiveRateLimiter = None, **kwargs) -> requests.Response:
+        return self.request("POST", url, idempotent, limiter, **kwargs)
+    
+    def get(self, url: str, limiter: AdaptiveRateLimiter = None, session: requests.Session = None, **kwargs) -> requests.Response:
+        return self.request("GET", url, True, limiter, session=session, **kwargs)
+    
+    def request(self, method: str, url: str, idempotent: bool = False, limiter: AdaptiveRateLimiter = None,
+                session: requests.Session = None, **kwargs) -> requests.Response:
+        """HTTP 요청
+        
+        idempotent=True: 연결 끊김/응답 타임아웃/5xx도 지수 백오프로 재시도
+        idempotent=False: 서버에 도달하지 못한 경우만 재시도 (중복 발송 방지)
+        429(할당량 초과)는 처리되지 않은 요청이라 항상 재시도 (Retry-After만큼 대기, limiter 감속)
+        limiter: 시도마다 토큰 획득 + 응답으로 속도 조절
+        session: 공용 풀 대신 쓸 세션 (구글 인증 세션 등, 재시도/속도 제한/통계는 동일)
+        """
+        parts = urlsplit(url)
+        endpoint = f"{parts.netloc}{parts.path}"
+        session = session or self._session(parts.netloc)
+        
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            wait = self.backoff * (2 ** attempt)
+            if limiter:
+                limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retry = not last and (idempotent or self._not_sent(e))
+                self.stats.record(endpoint, time.perf_counter() - start, error=True, retry=retry)
+                if not retry:
+                    raise
+                logger.warning(f"  {endpoint} 재시도 {attempt + 1}/{self.retries}: {e}")
+            else:
+                status = response.status_code
+                retry_after = parse_retry_after(response.headers)
+                if status in self.THROTTLE_STATUS or (status == 503 and retry_after is not None):
+                    if limiter:
+                        limiter.on_throttle(retry_after)
+                        wait = 0  # limiter가 Retry-After 동안 정지
+                    elif retry_after is not None:
+                        wait = retry_after
+                elif limiter and status < 500:
+                    limiter.on_success()
+                
+                retry = not last and (status in self.THROTTLE_STATUS or (idempotent and status in self.RETRY_STATUS))
+                self.stats.record(endpoint, time.perf_counter() - start, error=status >= 400, retry=retry)
+                if not retry:
+                    return response
+                logger.warning(f"  {endpoint} 재시도 {attempt + 1}/{self.retries}: HTTP {status}")
+            if wait:
+                time.sleep(wait)
+
+
+# PaySsam/알리고 공용 연결 풀, 속도 제한
+TRANSPORT = HttpTransport()
+GOVERNOR = RateGovernor()
+
+
+####---------- 비동기 실행 ----------####
+
+class AsyncRunner:
+    """프로세스 공용 이벤트 루프 1개 (백그라운드 스레드) + 블로킹 호출용 공용 스레드 풀
+    
+    - 발송/사이클 코루틴은 모두 이 루프에서 실행, 동기 코드는 run()으로 결과를 기다림
+    - requests/gspread 호출은 call(backend, ...)로 스레드 풀에서 실행 (HttpTransport 연결 풀 공유)
+    - 백엔드(aligo/payssam/sheets)별 동시 요청 수 제한, 초당 요청 수는 기존 속도 제한(RateGovernor)이 담당
+    """
+    
+    DEFAULT_LIMITS = {"aligo": ALIGO_CONCURRENCY, "payssam": PAYSSAM_CONCURRENCY, "sheets": SHEETS_CONCURRENCY}
+    
+    def __init__(self, limits: dict = None, threads: int = IO_THREADS):
+        self.limits = {**self.DEFAULT_LIMITS, **(limits or {})}
+        self.threads = threads
+        self._loop = None
+        self._thread = None
+        self._executor = None
+        self._semaphores = {}  # (루프, 백엔드) -> Semaphore
+        self._lock = threading.Lock()
+    
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="io")
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(self._executor)
+                self._thread = threading.Thread(target=loop.run_forever, name="async-loop", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+    
+    def in_loop(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+    
+    def run(self, coro):
+        """동기 코드에서 코루틴 실행 후 결과 반환 (루프 스레드 안에서는 await로 호출할 것)"""
+        if self.in_loop():
+            coro.close()
+            raise RuntimeError("이벤트 루프 안에서 동기 래퍼 호출 - await ..._async()를 사용")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop()).result()
+    
+    def _semaphore(self, backend: str) -> asyncio.Semaphore:
+        key = (asyncio.get_running_loop(), backend)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(self.limits.get(backend, self.threads))
+        return semaphore
+    
+    async def call(self, backend: Optional[str], func, *args, **kwargs):
+        """블로킹 호출을 스레드 풀에서 실행 (backend가 None이면 동시 실행 수 제한 없음)"""
+        loop = asyncio.get_running_loop()
+        if backend is None:
+            return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+        async with self._semaphore(backend):
+            return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+
+ASYNC = AsyncRunner()
+
+
+####---------- 청구서 ID 발급 ----------####
+
+class BillIdAllocator:
+    """bill_id 발급 - YYMMDD + 일련번호(36진수 6자리) + 행 번호(5자리) + 항목(최대 3자리) = 20자 이하
+    
+    - 일련번호는 파일 카운터에서 block개씩 예약 (파일 잠금 + 스레드 잠금 → 프로세스/스레드 간 중복 없음)
+    - 날짜가 바뀌면 카운터 초기화, 시작값은 자정 이후 초 x 1000 (카운터 파일을 잃어도 앞서 발급한 번호와 겹치지 않게)
+    """
+    
+    DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    SEQ_WIDTH = 6
+    MAX_LENGTH = 20
+    
+    def __init__(self, path: str = BILL_SEQ_PATH, block: int = BILL_ID_BLOCK):
+        self.path = path
+        self.block = max(1, block)
+        self._lock = threading.Lock()
+        self._date = None
+        self._next = 0
+        self._end = 0
+    
+    @classmethod
+    def _base36(cls, n: int) -> str:
+        digits = ""
+        while n:
+            n, rem = divmod(n, 36)
+            digits = cls.DIGITS[rem] + digits
+        return digits.rjust(cls.SEQ_WIDTH, "0")
+    
+    def _reserve(self, date: str, count: int):
+        """카운터 파일에서 [next, next + count) 예약 (self._lock 잡은 상태에서 호출)"""
+        now = datetime.now()
+        floor = (now.hour * 3600 + now.minute * 60 + now.second) * 1000
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), "r+", encoding="utf-8") as f:
+                try:
+                    state = json.loads(f.read() or "{}")
+                except ValueError:
+                    state = {}
+                start = state.get("next", 0) if state.get("date") == date else 0
+                start = max(start, floor)
+                if start + count > 36 ** self.SEQ_WIDTH:
+                    raise RuntimeError("bill_id 일련번호 소진 (하루 최대치 초과)")
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({"date": date, "next": start + count}))
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self._date, self._next, self._end = date, start, start + count
+    
+    def allocate_many(self, keys: List[Tuple[int, str]]) -> List[str]:
+        """[(행 번호, 항목 접미사)] → bill_id 목록 (한 번에 예약)"""
+        ids = []
+        with self._lock:
+            date = datetime.now().strftime("%y%m%d")
+            for row_num, suffix in keys:
+                if self._date != date or self._next >= self._end:
+                    self._reserve(date, max(self.block, len(keys) - len(ids)))
+                bill_id = f"{date}{self._base36(self._next)}{row_num % 100000:05d}{suffix}"
+                if len(bill_id) > self.MAX_LENGTH:
+                    raise ValueError(f"bill_id 20자 초과: {bill_id}")
+                self._next += 1
+                ids.append(bill_id)
+        return ids
+    
+    def allocate(self, row_num: int, suffix: str = "") -> str:
+        return self.allocate_many([(row_num, suffix)])[0]
+
+
+# 프로세스 공용 (여러 시트가 같은 카운터 사용)
+BILL_IDS = BillIdAllocator()
+
+
 ####---------- 결제선생(PaySsam) API ----------####
 
 @dataclass
@@ -52,25 +493,53 @@ class BillResult:
     short_url: str = ""
     code: str = ""
     message: str = ""
+    status: str = ""  # 결제 상태 (read_bill)
+
+
+# 결제선생 appr_state → 시트 '결제 상태' 표기
+PAYMENT_STATES = {"F": "결제완료", "W": "미결제", "C": "결제취소", "D": "파기"}
+FINAL_PAYMENT_STATES = ("결제완료", "결제취소", "파기")  # 더 바뀌지 않는 상태 (동기화 대상 제외)
+
+
+def payment_state_label(state: str) -> str:
+    return PAYMENT_STATES.get(state, state)
 
 
 class PaySsamAPI:
     BASE_URL = "https://erp-api.payssam.kr"
     
-    def __init__(self, api_key: str = None, member: str = None, merchant: str = None):
+    def __init__(self, api_key: str = None, member: str = None, merchant: str = None, transport: HttpTransport = None,
+                 base_url: str = None, limiter: AdaptiveRateLimiter = None, bill_ids: BillIdAllocator = None,
+                 runner: AsyncRunner = None):
         self.api_key = api_key or PAYSSAM_API_KEY
         self.member = member or PAYSSAM_MEMBER
         self.merchant = merchant or PAYSSAM_MERCHANT
+        self.transport = transport or TRANSPORT
+        self.limiter = limiter or GOVERNOR["payssam"]
+        self.bill_ids = bill_ids or BILL_IDS
+        self.runner = runner or ASYNC
+        if base_url:
+            self.BASE_URL = base_url
     
     def _generate_hash(self, bill_id: str, phone: str, price: str) -> str:
         data = f"{bill_id},{phone},{price}"
         return hashlib.sha256(data.encode()).hexdigest()
     
     def _generate_bill_id(self, row_num: int, suffix: str = "") -> str:
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        return f"{timestamp}{row_num:04d}{suffix}"
+        return self.bill_ids.allocate(row_num, suffix)
+    
+    def verify_callback(self, bill_id: str, phone: str, price: str, hash_value: str) -> bool:
+        """결제 결과 통보의 hash 확인 (발송 때와 같은 bill_id,phone,price SHA-256)"""
+        return hmac.compare_digest(self._generate_hash(bill_id, phone, price), str(hash_value or "").lower())
     
-    def send_bill(self, bill_id: str, product_nm: str, message: str, member_nm: str, phone: str, price: str, expire_dt: str = None, callback_url: str = "https://example.com/callback") -> BillResult:
+    async def _post_async(self, path: str, payload: dict, idempotent: bool = True) -> dict:
+        # 파기/조회는 같은 bill_id면 결과가 같아 재시도 안전, 발송은 idempotent=False (결과 불명은 저널 복구에서 조회로 확인)
+        response = await self.runner.call("payssam", self.transport.post, f"{self.BASE_URL}{path}", idempotent=idempotent, limiter=self.limiter,
+                                          json=payload, headers={"Content-Type": "application/json"})
+        return response.json()
+    
+    async def send_bill_async(self, bill_id: str, product_nm: str, message: str, member_nm: str, phone: str, price: str, expire_dt: str = None, callback_url: str = None) -> BillResult:
+        callback_url = callback_url or PAYSSAM_CALLBACK_URL
         if not expire_dt:
             expire_dt = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
         
@@ -94,8 +563,7 @@ class PaySsamAPI:
         }
         
         try:
-            response = requests.post(f"{self.BASE_URL}/if/bill/send", json=payload, headers={"Content-Type": "application/json"})
-            result = response.json()
+            result = await self._post_async("/if/bill/send", payload, idempotent=False)
             
             if result.get("code") == "0000":
                 return BillResult(success=True, bill_id=result.get("bill_id", bill_id), short_url=result.get("shortURL", ""), code=result.get("code"), message=result.get("msg", "성공"))
@@ -104,7 +572,7 @@ class PaySsamAPI:
         except Exception as e:
             return BillResult(success=False, bill_id=bill_id, message=str(e))
     
-    def destroy_bill(self, bill_id: str) -> BillResult:
+    async def destroy_bill_async(self, bill_id: str) -> BillResult:
         """청구서 파기"""
         payload = {
             "apikey": self.api_key,
@@ -116,8 +584,7 @@ class PaySsamAPI:
         }
         
         try:
-            response = requests.post(f"{self.BASE_URL}/if/bill/destroy", json=payload, headers={"Content-Type": "application/json"})
-            result = response.json()
+            result = await self._post_async("/if/bill/destroy", payload)
             
             if result.get("code") == "0000":
                 return BillResult(success=True, bill_id=bill_id, code=result.get("code"), message=result.get("msg", "파기 성공"))
@@ -125,11 +592,117 @@ class PaySsamAPI:
                 return BillResult(success=False, bill_id=bill_id, code=result.get("code", "9999"), message=result.get("msg", "알 수 없는 오류"))
         except Exception as e:
             return BillResult(success=False, bill_id=bill_id, message=str(e))
+    
+    async def read_bill_async(self, bill_id: str) -> BillResult:
+        """청구서 결제 상태 조회 (놓친 결제 통보 동기화용)"""
+        payload = {
+            "apikey": self.api_key,
+            "member": self.member,
+            "merchant": self.merchant,
+            "bill": {
+                "bill_id": bill_id
+            }
+        }
+        
+        try:
+            result = await self._post_async("/if/bill/read", payload)
+            
+            if result.get("code") == "0000":
+                bill = result.get("bill") or result
+                return BillResult(success=True, bill_id=bill_id, code=result.get("code"), message=result.get("msg", "조회 성공"),
+                                  status=payment_state_label(bill.get("appr_state", "")))
+            else:
+                return BillResult(success=False, bill_id=bill_id, code=result.get("code", "9999"), message=result.get("msg", "알 수 없는 오류"))
+        except Exception as e:
+            return BillResult(success=False, bill_id=bill_id, message=str(e))
+    
+    # 동기 호출용 (저널 복구, 수동 실행 등)
+    def send_bill(self, bill_id: str, product_nm: str, message: str, member_nm: str, phone: str, price: str, expire_dt: str = None, callback_url: str = None) -> BillResult:
+        return self.runner.run(self.send_bill_async(bill_id, product_nm, message, member_nm, phone, price, expire_dt, callback_url))
+    
+    def destroy_bill(self, bill_id: str) -> BillResult:
+        return self.runner.run(self.destroy_bill_async(bill_id))
+    
+    def read_bill(self, bill_id: str) -> BillResult:
+        return self.runner.run(self.read_bill_async(bill_id))
+    
+    async def bill_exists_async(self, bill_id: str) -> Optional[bool]:
+        """bill_id로 등록된 청구서가 있는지 (/if/bill/read) - True 있음 / False 없음 / None 응답 없음(확인 불가)"""
+        result = await self.read_bill_async(bill_id)
+        if result.success:
+            return True
+        return False if result.code else None
+
+####---------- 메시지 템플릿 ----------####
+
+SMS_MAX_BYTES = 90  # EUC-KR 기준, 넘으면 LMS
+
+
+@lru_cache(maxsize=8192)
+def euckr_len(text: str) -> int:
+    """알리고 기준 바이트 수 (같은 이름/과정명은 캐시)"""
+    return len(text.encode('euc-kr', errors='replace'))
+
+
+@dataclass(frozen=True)
+class RenderedMessage:
+    text: str
+    byte_len: int
+    
+    @property
+    def msg_type(self) -> str:
+        return "LMS" if self.byte_len > SMS_MAX_BYTES else "SMS"
+
+
+class MessageTemplate:
+    """{변수} 형식 템플릿 - 고정 문구는 컴파일 시 1회만 바이트 계산, 렌더링 결과는 변수값별 캐시"""
+    
+    def __init__(self, name: str, source: str, cache_size: int = 4096):
+        self.name = name
+        self._parts = []  # (문구, 변수 여부)
+        self._static_len = 0
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(source):
+            if literal:
+                self._parts.append((literal, False))
+                self._static_len += euckr_len(literal)
+            if field_name is not None:
+                if not field_name.isidentifier() or format_spec or conversion:
+                    raise ValueError(f"템플릿 {name}: 변수는 {{이름}} 형식만 사용 가능 ({field_name!r})")
+                self._parts.append((field_name, True))
+        self.fields = tuple(dict.fromkeys(part for part, is_field in self._parts if is_field))
+        self._render = lru_cache(maxsize=cache_size)(self._render_values)
+    
+    def _render_values(self, values: tuple) -> RenderedMessage:
+        named = dict(zip(self.fields, values))
+        text = "".join(named[part] if is_field else part for part, is_field in self._parts)
+        byte_len = self._static_len + sum(euckr_len(named[part]) for part, is_field in self._parts if is_field)
+        return RenderedMessage(text, byte_len)
+    
+    def render(self, **values) -> RenderedMessage:
+        missing = [name for name in self.fields if name not in values]
+        if missing:
+            raise KeyError(f"템플릿 {self.name}: 변수 누락 {missing}")
+        return self._render(tuple(str(values[name]) for name in self.fields))
+
+
+class TemplateStore:
+    """templates.json (이름 → 문자열 또는 줄 목록) 로드 후 템플릿별 1회 컴파일"""
+    
+    def __init__(self, path: str = TEMPLATES_PATH):
+        with open(path, encoding="utf-8") as f:
+            sources = json.load(f)
+        self.templates = {
+            name: MessageTemplate(name, "\n".join(source) if isinstance(source, list) else source)
+            for name, source in sources.items()
+        }
+    
+    def render(self, name: str, **values) -> RenderedMessage:
+        return self.templates[name].render(**values)
 
 
 ####---------- 데이터 클래스 ----------####
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class BillItem:
     bill_type: str      # 시트 기록용
     product_nm: str     # 청구서용
@@ -138,7 +711,77 @@ class BillItem:
     price: int
 
 
-@dataclass
+class CourseCatalog:
+    """선택지 원문 → BillItem 변환표 (한 번 파싱한 선택지는 재사용)"""
+    
+    # 과정별 (온라인, 현강) 수강료
+    PRICES = {
+        "surinonseul_regular": (398000, 838000),
+        "surinonseul_trial": (20000, 20000),
+        "suneung_regular": (280000, 400000),
+    }
+    SEPARATOR = re.compile("[ㅣᅵ]")
+    
+    def __init__(self):
+        self._options = {}  # (과정, 선택지 원문) -> BillItem (마감은 None)
+    
+    def _compile(self, course: str, raw: str) -> Optional[BillItem]:
+        if "마감" in raw:
+            return None
+        parts = self.SEPARATOR.split(raw)
+        base = parts[0].strip()
+        schedule = "ㅣ".join(parts[1:]).strip() if len(parts) > 1 else ""
+        price_online, price_offline = self.PRICES[course]
+        price = price_offline if "현강" in raw else price_online
+        return BillItem(bill_type=base, product_nm=f"{base} 원비 안내", reason=base, schedule=schedule, price=price)
+    
+    def parse(self, course: str, raw_data: str) -> List[BillItem]:
+        items = []
+        if not raw_data or not raw_data.strip():
+            return items
+        for raw in [s.strip() for s in raw_data.split(",") if s.strip()]:
+            key = (course, raw)
+            if key not in self._options:
+                self._options[key] = self._compile(course, raw)
+            item = self._options[key]
+            if item is not None:
+                items.append(item)
+        return items
+
+
+CATALOG = CourseCatalog()
+
+
+@dataclass(slots=True)
+class BillRecord:
+    bill_id: str
+    sent_at: str = ""
+    adjusted: bool = False
+
+
+ADJUSTED_MARK = "(조정)"
+_RECORD_TIME = re.compile(r"\s+(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})$")
+
+
+def _record_lines(cell: str) -> List[str]:
+    return [line.strip() for line in cell.strip().split("\n") if line.strip()] if cell else []
+
+
+def _split_record(line: str) -> Tuple[str, str]:
+    """"{bill_type} {YYYY-mm-dd HH:MM:SS}" → (bill_type, 시각)"""
+    match = _RECORD_TIME.search(line)
+    if not match:
+        return line, ""
+    return line[:match.start()], match.group(1)
+
+
+def _split_bill_id(line: str) -> Tuple[str, str]:
+    """"{bill_type} {bill_id}" → (bill_type, bill_id), 마지막 공백 기준 (bill_type에 공백이 포함될 수 있음)"""
+    parts = line.rsplit(" ", 1)
+    return (parts[0], parts[1]) if len(parts) == 2 else (line, "")
+
+
+@dataclass(slots=True)
 class Applicant:
     timestamp: str
     user_type: str
@@ -155,6 +798,16 @@ class Applicant:
     existing_bill_id: str = ""
     price_adjustment: str = ""
     
+    # 파싱 결과 캐시 (선택 항목 내용이 바뀌면 다시 파싱)
+    _items_key: tuple = field(default=None, init=False, repr=False, compare=False)
+    _items: list = field(default=None, init=False, repr=False, compare=False)
+    _items_by_type: dict = field(default=None, init=False, repr=False, compare=False)
+    
+    # 문자/청구서 기록 파싱 결과 (시트에서 읽을 때 1회 파싱, 기록할 때 함께 갱신)
+    _ledger_key: tuple = field(default=None, init=False, repr=False, compare=False)
+    _sms_types: set = field(default=None, init=False, repr=False, compare=False)
+    _bills: dict = field(default=None, init=False, repr=False, compare=False)
+    
     @property
     def primary_phone(self) -> str:
         phone = self.parent_phone or self.student_phone
@@ -173,58 +826,161 @@ class Applicant:
         except ValueError:
             return 0
     
-    def _parse_selections(self, raw_data: str, price_online: int, price_offline: int) -> List[BillItem]:
-        items = []
-        if not raw_data or not raw_data.strip():
-            return items
-        
-        for raw in [s.strip() for s in raw_data.split(",") if s.strip()]:
-            if "마감" in raw:
-                continue
-            parts = raw.replace("ᅵ", "ㅣ").split("ㅣ")
-            base = parts[0].strip()
-            schedule = "ㅣ".join(parts[1:]).strip() if len(parts) > 1 else ""
-            product_nm = f"{base} 원비 안내"
-            price = price_offline if "현강" in raw else price_online
-            items.append(BillItem(bill_type=base, product_nm=product_nm, reason=base, schedule=schedule, price=price))
-        return items
-    
     def get_bill_items(self) -> List[BillItem]:
-        items = []
-        items.extend(self._parse_selections(self.surinonseul_regular, 398000, 838000))
-        
-        if self.surinonseul_trial and self.surinonseul_trial.strip():
-            for raw in [s.strip() for s in self.surinonseul_trial.split(",") if s.strip()]:
-                if "마감" in raw:
-                    continue
-                parts = raw.replace("ᅵ", "ㅣ").split("ㅣ")
-                base = parts[0].strip()
-                schedule = "ㅣ".join(parts[1:]).strip() if len(parts) > 1 else ""
-                product_nm = f"{base} 원비 안내"
-                items.append(BillItem(bill_type=base, product_nm=product_nm, reason=base, schedule=schedule, price=20000))
-        
-        items.extend(self._parse_selections(self.suneung_regular, 280000, 400000))
-        return items
+        """신청 항목 목록 (캐시된 리스트이므로 수정하지 말 것)"""
+        key = (self.surinonseul_regular, self.surinonseul_trial, self.suneung_regular)
+        if self._items_key != key:
+            items = []
+            for course in CourseCatalog.PRICES:
+                items.extend(CATALOG.parse(course, getattr(self, course)))
+            self._items = items
+            self._items_by_type = {}
+            for item in items:
+                self._items_by_type.setdefault(item.bill_type, item)
+            self._items_key = key
+        return self._items
+    
+    def get_bill_item(self, bill_type: str) -> Optional[BillItem]:
+        self.get_bill_items()
+        return self._items_by_type.get(bill_type)
+    
+    def _ledger(self) -> Tuple[set, dict]:
+        key = (self.existing_sms, self.existing_bill_sent, self.existing_bill_id)
+        if self._ledger_key != key:
+            self._sms_types = {_split_record(line)[0] for line in _record_lines(self.existing_sms)}
+            
+            sent = {}
+            for line in _record_lines(self.existing_bill_sent):
+                label, sent_at = _split_record(line)
+                adjusted = label.endswith(ADJUSTED_MARK)
+                if adjusted:
+                    label = label[:-len(ADJUSTED_MARK)]
+                sent[label] = (sent_at, adjusted)  # 같은 항목은 마지막 기록 우선
+            
+            self._bills = {}
+            for line in _record_lines(self.existing_bill_id):
+                bill_type, bill_id = _split_bill_id(line)
+                sent_at, adjusted = sent.get(bill_type, ("", False))
+                self._bills[bill_type] = BillRecord(bill_id=bill_id, sent_at=sent_at, adjusted=adjusted)
+            self._ledger_key = key
+        return self._sms_types, self._bills
+    
+    def has_sms(self, bill_type: str) -> bool:
+        return bill_type in self._ledger()[0]
+    
+    def has_bill(self, bill_type: str) -> bool:
+        return bill_type in self._ledger()[1]
+    
+    def get_bill_records(self) -> dict:
+        """{bill_type: BillRecord}"""
+        return self._ledger()[1]
     
     def get_pending_bill_items(self) -> List[BillItem]:
-        return [item for item in self.get_bill_items() if item.bill_type not in self.existing_bill_id]
+        return [item for item in self.get_bill_items() if not self.has_bill(item.bill_type)]
     
     def get_pending_sms_items(self) -> List[BillItem]:
-        return [item for item in self.get_bill_items() if item.bill_type not in self.existing_sms]
+        return [item for item in self.get_bill_items() if not self.has_sms(item.bill_type)]
+    
+    def get_bill_ready_items(self) -> List[BillItem]:
+        """신청 문자는 나갔고 청구서는 아직인 항목"""
+        return [item for item in self.get_pending_bill_items() if self.has_sms(item.bill_type)]
+    
+    def record_sms(self, bill_type: str, sent_at: str):
+        sms_types, _ = self._ledger()
+        line = f"{bill_type} {sent_at}"
+        self.existing_sms = f"{self.existing_sms}\n{line}" if self.existing_sms.strip() else line
+        sms_types.add(bill_type)
+        self._ledger_key = (self.existing_sms, self.existing_bill_sent, self.existing_bill_id)
+    
+    def record_bill(self, bill_type: str, bill_id: str, sent_at: str, adjusted: bool = False):
+        """청구서 기록 추가 (같은 항목의 기존 ID는 교체)"""
+        _, bills = self._ledger()
+        
+        sent_line = f"{bill_type}{ADJUSTED_MARK if adjusted else ''} {sent_at}"
+        self.existing_bill_sent = f"{self.existing_bill_sent}\n{sent_line}" if self.existing_bill_sent.strip() else sent_line
+        
+        id_line = f"{bill_type} {bill_id}"
+        if bill_type in bills:
+            lines = [id_line if _split_bill_id(line)[0] == bill_type else line for line in _record_lines(self.existing_bill_id)]
+            self.existing_bill_id = "\n".join(lines)
+        else:
+            self.existing_bill_id = f"{self.existing_bill_id}\n{id_line}" if self.existing_bill_id.strip() else id_line
+        
+        bills[bill_type] = BillRecord(bill_id=bill_id, sent_at=sent_at, adjusted=adjusted)
+        self._ledger_key = (self.existing_sms, self.existing_bill_sent, self.existing_bill_id)
+    
+    def get_payment_statuses(self) -> dict:
+        """결제 상태 열 "{bill_type} {상태}" 줄 → {bill_type: 상태}"""
+        return dict(_split_bill_id(line) for line in _record_lines(self.existing_status))
+    
+    def record_payment(self, bill_type: str, status: str) -> bool:
+        """결제 상태 기록 (같은 항목 줄은 교체), 바뀐 게 없으면 False"""
+        if self.get_payment_statuses().get(bill_type) == status:
+            return False
+        line = f"{bill_type} {status}"
+        lines = _record_lines(self.existing_status)
+        if any(_split_bill_id(old)[0] == bill_type for old in lines):
+            lines = [line if _split_bill_id(old)[0] == bill_type else old for old in lines]
+        else:
+            lines.append(line)
+        self.existing_status = "\n".join(lines)
+        return True
+    
+    def fingerprint(self) -> str:
+        """선택 항목 + 상태 열 내용 해시 (변경 감지용)"""
+        fields = (
+            self.timestamp, self.student_name, self.parent_phone, self.student_phone,
+            self.surinonseul_regular, self.surinonseul_trial, self.suneung_regular,
+            self.existing_status, self.existing_sms, self.existing_bill_sent, self.existing_bill_id, self.price_adjustment,
+        )
+        return hashlib.sha1("\x1f".join(fields).encode()).hexdigest()
+    
+    def is_settled(self) -> bool:
+        """문자/청구서/가격조정 모두 처리 완료된 상태인지"""
+        if self.adjustment_amount != 0 or self.get_pending_sms_items():
+            return False
+        return not self.get_bill_ready_items()
     
     def get_existing_bill_ids(self) -> dict:
         """기존 청구서 ID들을 {bill_type: bill_id} 형태로 반환"""
-        result = {}
-        if not self.existing_bill_id:
-            return result
-        for line in self.existing_bill_id.strip().split("\n"):
-            # 마지막 공백 기준으로 분리 (bill_type에 공백이 포함될 수 있음)
-            parts = line.strip().rsplit(" ", 1)
-            if len(parts) >= 2:
-                bill_type = parts[0]
-                bill_id = parts[1]
-                result[bill_type] = bill_id
-        return result
+        return {bill_type: record.bill_id for bill_type, record in self.get_bill_records().items() if record.bill_id}
+
+
+class ApplicantStore:
+    """사이클 스냅샷 + '문자 필요 / 청구서 필요 / 가격조정 필요' 행 집합
+    
+    만들 때 1회 판정, 이후 기록(record_*)할 때 해당 학생만 다시 판정 → 조회는 집합 크기만큼만
+    """
+    
+    def __init__(self, applicants: List[Applicant]):
+        self.source = applicants
+        self._by_row = {app.row_num: app for app in applicants}
+        self.needs_sms = set()
+        self.needs_bill = set()
+        self.needs_adjust = set()
+        for app in applicants:
+            self.refresh(app)
+    
+    def refresh(self, app: Applicant):
+        row = app.row_num
+        if row not in self._by_row:
+            return
+        for needs, needed in (
+            (self.needs_sms, bool(app.get_pending_sms_items())),
+            (self.needs_bill, bool(app.get_bill_ready_items())),
+            (self.needs_adjust, app.adjustment_amount != 0),
+        ):
+            if needed:
+                needs.add(row)
+            else:
+                needs.discard(row)
+    
+    def select(self, rows: set) -> List[Applicant]:
+        """행 번호 순서 (시트 순서)"""
+        return [self._by_row[row] for row in sorted(rows)]
+    
+    def idle(self) -> bool:
+        return not (self.needs_sms or self.needs_bill)
 
 
 @dataclass
@@ -232,6 +988,631 @@ class SMSResult:
     success: bool
     msg_id: int = 0
     message: str = ""
+    unknown: bool = False  # 응답을 못 받아 발송 여부를 모름 (전송 내역으로 확인 전까지 재발송 금지)
+
+
+####---------- 행 상태 저장소 ----------####
+
+class RowStateStore:
+    """처리 완료된 행의 내용 해시를 파일에 저장 → 내용이 그대로인 행은 다음 사이클에서 건너뜀"""
+    
+    def __init__(self, path: str = ROW_STATE_PATH):
+        self.path = path
+        self._rows = {}  # 행 번호(str) -> fingerprint
+        self._dirty = False
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._rows = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"행 상태 파일 읽기 실패, 전체 행 재확인: {e}")
+    
+    def is_unchanged(self, app: Applicant) -> bool:
+        return self._rows.get(str(app.row_num)) == app.fingerprint()
+    
+    def update(self, app: Applicant):
+        key = str(app.row_num)
+        if app.is_settled():
+            fingerprint = app.fingerprint()
+            if self._rows.get(key) != fingerprint:
+                self._rows[key] = fingerprint
+                self._dirty = True
+        elif self._rows.pop(key, None) is not None:
+            self._dirty = True
+    
+    def prune(self, last_row: int):
+        """시트에서 사라진 행 정리"""
+        for key in [k for k in self._rows if int(k) > last_row]:
+            del self._rows[key]
+            self._dirty = True
+    
+    def save(self):
+        if not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._rows, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+####---------- 발송 기록(outbox) ----------####
+
+@dataclass
+class JournalEntry:
+    id: int
+    kind: str         # "sms" | "bill" | "adjust"
+    row_num: int
+    phone: str
+    bill_type: str
+    ref: str          # 청구서 ID / 문자 msg_id
+    payload: dict
+    status: str       # pending → sent → done (또는 failed / unknown)
+    created_at: str = ""
+
+
+class SendJournal:
+    """발송 의도를 발송 전에 기록하는 로컬 저널 (SQLite WAL)
+    
+    pending: 발송 직전 기록 / sent: 발송 성공, 시트 반영 대기 / done: 시트 반영 확인 / failed: 백엔드가 거절
+    unknown: 응답 타임아웃 등으로 발송 여부를 모름 → 백엔드에서 확인될 때까지 재발송하지 않음
+    프로세스가 죽거나 시트 기록이 실패해도 다음 사이클에서 pending/sent/unknown 항목을 확인해 시트에 다시 반영 → 중복 발송 없음
+    """
+    
+    KEEP_DAYS = 30
+    
+    def __init__(self, path: str = JOURNAL_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                row_num INTEGER NOT NULL,
+                phone TEXT NOT NULL,
+                bill_type TEXT NOT NULL,
+                ref TEXT NOT NULL DEFAULT '',
+                payload TEXT NOT NULL DEFAULT '{}',
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status)")
+        cutoff = (datetime.now() - timedelta(days=self.KEEP_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        self._conn.execute("DELETE FROM outbox WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,))
+    
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    def begin(self, intents: List[Tuple[str, int, str, str, str, dict]]) -> List[int]:
+        """[(kind, row_num, phone, bill_type, ref, payload)] 를 pending으로 기록 → id 목록"""
+        now = self._now()
+        ids = []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for kind, row_num, phone, bill_type, ref, payload in intents:
+                cursor = self._conn.execute(
+                    "INSERT INTO outbox (kind, row_num, phone, bill_type, ref, payload, status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?)",
+                    (kind, row_num, phone, bill_type, ref, json.dumps(payload, ensure_ascii=False), now, now))
+                ids.append(cursor.lastrowid)
+            self._conn.execute("COMMIT")
+        return ids
+    
+    def _set_status(self, ids: List[int], status: str, ref: str = None):
+        if not ids:
+            return
+        now = self._now()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for entry_id in ids:
+                if ref is None:
+                    self._conn.execute("UPDATE outbox SET status = ?, updated_at = ? WHERE id = ?", (status, now, entry_id))
+                else:
+                    self._conn.execute("UPDATE outbox SET status = ?, ref = ?, updated_at = ? WHERE id = ?", (status, ref, now, entry_id))
+            self._conn.execute("COMMIT")
+    
+    def mark_sent(self, entry_id: int, ref: str = None):
+        self._set_status([entry_id], "sent", ref)
+    
+    def mark_failed(self, entry_id: int):
+        self._set_status([entry_id], "failed")
+    
+    def mark_unknown(self, entry_id: int, ref: str = None):
+        self._set_status([entry_id], "unknown", ref)
+    
+    def mark_done(self, ids: List[int]):
+        self._set_status(ids, "done")
+    
+    def unfinished(self) -> List[JournalEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, row_num, phone, bill_type, ref, payload, status, created_at FROM outbox "
+                "WHERE status IN ('pending', 'sent', 'unknown') ORDER BY id").fetchall()
+        return [JournalEntry(id=r[0], kind=r[1], row_num=r[2], phone=r[3], bill_type=r[4], ref=r[5], payload=json.loads(r[6]),
+                             status=r[7], created_at=r[8]) for r in rows]
+    
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sent', 'unknown')").fetchone()[0]
+    
+    def known_refs(self, kind: str) -> set:
+        """이미 어느 발송 건의 것으로 확인된 ref (문자 msg_id 등)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT ref FROM outbox WHERE kind = ? AND ref != ''", (kind,)).fetchall()
+        return {r[0] for r in rows}
+
+
+####---------- 시트 쓰기 버퍼 ----------####
+
+def rowcol_to_a1(row: int, col: int) -> str:
+    """(1, 1) → "A1" (gspread.utils와 동일, gspread 없이 쓰려고 따로 둠)"""
+    letters = ""
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return f"{letters}{row}"
+
+
+def a1_to_rowcol(label: str) -> Tuple[int, int]:
+    """"A1" → (1, 1)"""
+    match = re.match(r"([A-Za-z]+)(\d+)$", label)
+    if not match:
+        raise ValueError(f"잘못된 셀 주소: {label}")
+    col = 0
+    for ch in match.group(1).upper():
+        col = col * 26 + ord(ch) - 64
+    return int(match.group(2)), col
+
+
+class SheetWriteBuffer:
+    """셀 변경을 모아두었다가 batch_update 1회로 기록"""
+    
+    def __init__(self, sheet, max_pending: int = SHEET_WRITE_BATCH):
+        self.sheet = sheet
+        self.max_pending = max_pending
+        self._pending = {}  # (row, col) -> value, 같은 셀은 마지막 값만 기록
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._pending)
+    
+    def add(self, row: int, col: int, value: str, auto_flush: bool = True):
+        """auto_flush=False: 가득 차도 바로 기록하지 않음 (이벤트 루프에서는 호출한 쪽이 스레드 풀에서 flush)"""
+        with self._lock:
+            self._pending[(row, col)] = value
+            full = len(self._pending) >= self.max_pending
+        if full and auto_flush:
+            self.flush()
+    
+    def full(self) -> bool:
+        return len(self._pending) >= self.max_pending
+    
+    def remap_columns(self, mapping: dict) -> int:
+        """열 위치가 바뀌면 대기 중인 셀을 새 열로 옮김 (mapping: 예전 열 → 새 열, 새 열이 없으면 버림), 버린 셀 수 반환"""
+        with self._lock:
+            pending = {(row, mapping[col]): value for (row, col), value in self._pending.items() if mapping.get(col)}
+            dropped, self._pending = len(self._pending) - len(pending), pending
+        return dropped
+    
+    def flush(self) -> int:
+        """대기 중인 셀 기록, 기록한 셀 수 반환"""
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+        
+        data = [{"range": rowcol_to_a1(row, col), "values": [[value]]} for (row, col), value in sorted(pending.items())]
+        try:
+            self.sheet.batch_update(data, value_input_option="USER_ENTERED")
+        except Exception:
+            # 실패한 셀은 다시 대기열로 (그 사이 새로 들어온 값이 우선)
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending.setdefault(key, value)
+            raise
+        return len(data)
+
+
+####---------- 사이클 지표 ----------####
+
+class MeteredSheet:
+    """워크시트 메서드 호출마다 속도 제한 + 소요 시간 기록 (gspread 워크시트 / LocalSheet 공용 래퍼)
+    
+    429(할당량 초과)는 limiter 감속 후 재시도 (처리되지 않은 요청이라 쓰기도 안전)
+    """
+    
+    def __init__(self, sheet, stats: CallStats, limiter: AdaptiveRateLimiter = None, retries: int = HTTP_RETRIES):
+        self._sheet = sheet
+        self._stats = stats
+        self._limiter = limiter
+        self._retries = retries
+    
+    def __getattr__(self, name):
+        attr = getattr(self._sheet, name)
+        if not callable(attr):
+            return attr
+        
+        def call(*args, **kwargs):
+            for attempt in range(self._retries + 1):
+                if self._limiter:
+                    self._limiter.acquire()
+                start = time.perf_counter()
+                try:
+                    result = attr(*args, **kwargs)
+                except Exception as e:
+                    response = getattr(e, "response", None)
+                    throttled = getattr(response, "status_code", None) == 429
+                    retry = throttled and attempt < self._retries
+                    self._stats.record(f"sheets/{name}", time.perf_counter() - start, error=True, retry=retry)
+                    if not throttled:
+                        raise
+                    retry_after = parse_retry_after(getattr(response, "headers", None))
+                    if self._limiter:
+                        self._limiter.on_throttle(retry_after)
+                    if not retry:
+                        raise
+                    logger.warning(f"  시트 {name} 할당량 초과, 재시도 {attempt + 1}/{self._retries}")
+                    if not self._limiter:
+                        time.sleep(retry_after or 2 ** attempt)
+                else:
+                    self._stats.record(f"sheets/{name}", time.perf_counter() - start)
+                    if self._limiter:
+                        self._limiter.on_success()
+                    return result
+        return call
+
+
+class CycleMetrics:
+    """check_and_send 1사이클 지표 (단계별 소요 시간, 행 수)"""
+    
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.rows = {"total": 0, "active": 0}
+    
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+    
+    def finish(self, results: dict, api: dict, queue: dict, rates: dict = None) -> dict:
+        buckets = [str(le) for le in CallStats.BUCKETS] + ["+Inf"]
+        return {
+            "ts": self.started_at.isoformat(timespec="seconds"),
+            "duration": round(time.perf_counter() - self._start, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "rows": dict(self.rows),
+            "api": {
+                endpoint: {
+                    "count": stat["count"],
+                    "errors": stat["errors"],
+                    "retries": stat["retries"],
+                    "sum": round(stat["total"], 4),
+                    "max": round(stat["max"], 4),
+                    "buckets": dict(zip(buckets, stat["buckets"])),
+                }
+                for endpoint, stat in api.items()
+            },
+            "results": {kind: result for kind, result in results.items() if result},
+            "queue": queue,
+            "rates": rates or {},
+        }
+
+
+class MetricsExporter:
+    """사이클 지표 내보내기 - JSON lines 파일 + Prometheus 텍스트 (파일 또는 웹훅 서버 GET /metrics)
+    
+    labels: 모든 지표에 붙일 라벨 (여러 시트 동시 실행 시 {"target": 이름})
+    max_bytes/backups: JSON lines 파일이 max_bytes를 넘으면 .1, .2 ... 로 돌리고 backups개만 보관
+    """
+    
+    def __init__(self, jsonl_path: str = METRICS_PATH, prom_path: str = METRICS_PROM_PATH, labels: dict = None,
+                 max_bytes: int = METRICS_MAX_BYTES, backups: int = METRICS_BACKUPS):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.labels = labels or {}
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._cycles = 0
+        self._sends = {}  # (kind, status) -> 누적
+        self._api = {}    # endpoint -> 누적 count/errors/retries/sum/buckets
+        self.last = None
+    
+    def export(self, cycle: dict):
+        if self.labels:
+            cycle = {**self.labels, **cycle}
+        with self._lock:
+            self._cycles += 1
+            for kind, result in cycle["results"].items():
+                for status, count in result.items():
+                    self._sends[(kind, status)] = self._sends.get((kind, status), 0) + count
+            for endpoint, stat in cycle["api"].items():
+                total = self._api.setdefault(endpoint, {"count": 0, "errors": 0, "retries": 0, "sum": 0.0, "buckets": {}})
+                for key in ("count", "errors", "retries", "sum"):
+                    total[key] += stat[key]
+                for le, count in stat["buckets"].items():
+                    total["buckets"][le] = total["buckets"].get(le, 0) + count
+            self.last = cycle
+        
+        if self.jsonl_path:
+            line = json.dumps(cycle, ensure_ascii=False) + "\n"
+            self._rotate(len(line.encode("utf-8")))
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(line)
+        if self.prom_path:
+            tmp_path = f"{self.prom_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, self.prom_path)
+    
+    def _rotate(self, incoming: int):
+        """이번 줄을 쓰면 max_bytes를 넘을 때 파일 돌리기 (logging RotatingFileHandler와 같은 이름 규칙)"""
+        if not self.max_bytes:
+            return
+        try:
+            size = os.path.getsize(self.jsonl_path)
+        except OSError:
+            return
+        if not size or size + incoming <= self.max_bytes:
+            return
+        if self.backups <= 0:
+            os.remove(self.jsonl_path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.jsonl_path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.jsonl_path}.{i + 1}")
+        os.replace(self.jsonl_path, f"{self.jsonl_path}.1")
+    
+    def samples(self) -> List[Tuple[str, str, dict, float]]:
+        """(지표명, 종류, 라벨, 값) 목록"""
+        with self._lock:
+            last = self.last or {"duration": 0, "stages": {}, "rows": {}, "queue": {}, "rates": {}}
+            samples = [
+                ("apply_cycles_total", "counter", {}, self._cycles),
+                ("apply_cycle_duration_seconds", "gauge", {}, last["duration"]),
+            ]
+            samples += [("apply_stage_duration_seconds", "gauge", {"stage": k}, v) for k, v in last["stages"].items()]
+            samples += [("apply_rows", "gauge", {"kind": k}, v) for k, v in last["rows"].items()]
+            samples += [("apply_queue_depth", "gauge", {"queue": k}, v) for k, v in last["queue"].items()]
+            samples += [("apply_rate_limit", "gauge", {"backend": k}, v["rate"]) for k, v in last["rates"].items()]
+            samples += [("apply_throttles_total", "counter", {"backend": k}, v["throttles"]) for k, v in last["rates"].items()]
+            samples += [("apply_sends_total", "counter", {"kind": k, "status": st}, v) for (k, st), v in sorted(self._sends.items())]
+            
+            for endpoint, total in sorted(self._api.items()):
+                labels = {"endpoint": endpoint}
+                samples.append(("apply_api_errors_total", "counter", labels, total["errors"]))
+                samples.append(("apply_api_retries_total", "counter", labels, total["retries"]))
+                cumulative = 0
+                for le in [str(b) for b in CallStats.BUCKETS] + ["+Inf"]:
+                    cumulative += total["buckets"].get(le, 0)
+                    samples.append(("apply_api_latency_seconds_bucket", "histogram", {**labels, "le": le}, cumulative))
+                samples.append(("apply_api_latency_seconds_sum", "histogram", labels, round(total["sum"], 4)))
+                samples.append(("apply_api_latency_seconds_count", "histogram", labels, total["count"]))
+        return [(name, kind, {**self.labels, **labels}, value) for name, kind, labels, value in samples]
+    
+    def prometheus_text(self) -> str:
+        return prometheus_text([self])
+
+
+def prometheus_text(exporters: List[MetricsExporter]) -> str:
+    """여러 대상의 지표를 지표명별로 모아 Prometheus 텍스트로 (TYPE 줄은 지표당 1번)"""
+    families = {}
+    for exporter in exporters:
+        for name, kind, labels, value in exporter.samples():
+            family = re.sub(r"_(bucket|sum|count)$", "", name) if kind == "histogram" else name
+            families.setdefault(family, (kind, []))[1].append((name, labels, value))
+    
+    lines = []
+    for family, (kind, samples) in families.items():
+        lines.append(f"# TYPE {family} {kind}")
+        for name, labels, value in samples:
+            label_text = ",".join(f'{k}="{_prom_label(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _prom_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+####---------- 구글 인증 ----------####
+
+GOOGLE_SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+DRIVE_FILE_URL = "https://www.googleapis.com/drive/v3/files/{}"
+
+
+def _credentials_json() -> str:
+    # 환경변수에서 credentials JSON 로드 (GitHub Actions용)
+    google_creds_json = os.environ.get("GOOGLE_CREDENTIALS_JSON")
+    if google_creds_json:
+        return google_creds_json
+    with open(CREDENTIALS_PATH, encoding="utf-8") as f:
+        return f.read()
+
+
+class GoogleCache:
+    """구글 접근 토큰, 워크시트 정보(ID/제목/헤더), 시트별 '처리할 것 없음' 상태를 로컬 파일에 보관
+    
+    재시작해도 토큰 만료 전까지는 토큰 교환/스프레드시트 메타데이터 조회 생략
+    """
+    
+    def __init__(self, path: str = GOOGLE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.data = {}
+    
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)  # 토큰이 들어 있으므로 본인만 읽기
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+    
+    @staticmethod
+    def _account(credentials_json: str) -> str:
+        return hashlib.sha1(credentials_json.encode()).hexdigest()[:16]
+    
+    def token(self, credentials_json: str) -> Optional[Tuple[str, datetime]]:
+        """만료 1분 이상 남은 토큰 (expiry는 google-auth 방식대로 naive UTC)"""
+        with self._lock:
+            cached = self.data.get("token")
+        if not cached or cached.get("account") != self._account(credentials_json):
+            return None
+        expiry = datetime.fromisoformat(cached["expiry"])
+        if expiry - timedelta(minutes=1) <= datetime.now(timezone.utc).replace(tzinfo=None):
+            return None
+        return cached["token"], expiry
+    
+    def set_token(self, credentials_json: str, token: str, expiry: datetime) -> bool:
+        """토큰이 바뀌었으면 기록, 바뀐 경우 True"""
+        with self._lock:
+            cached = self.data.get("token") or {}
+            if cached.get("token") == token:
+                return False
+            self.data["token"] = {"account": self._account(credentials_json), "token": token, "expiry": expiry.isoformat()}
+        return True
+    
+    def _sheet(self, sheet_id: str, title: str) -> dict:
+        return self.data.setdefault("sheets", {}).setdefault(f"{sheet_id}/{title}", {})
+    
+    def worksheet(self, sheet_id: str, title: str) -> Optional[dict]:
+        with self._lock:
+            return self._sheet(sheet_id, title).get("worksheet")
+    
+    def set_worksheet(self, sheet_id: str, title: str, properties: dict, headers: list = None):
+        with self._lock:
+            entry = self._sheet(sheet_id, title)
+            entry["worksheet"] = {**entry.get("worksheet", {}), **properties}
+            if headers is not None:
+                entry["worksheet"]["headers"] = headers
+    
+    def idle(self, sheet_id: str, title: str) -> Optional[dict]:
+        """마지막 전체 확인에서 처리할 것이 없었으면 {"modified_time", "checked_at"}"""
+        with self._lock:
+            return self._sheet(sheet_id, title).get("idle")
+    
+    def set_idle(self, sheet_id: str, title: str, modified_time: Optional[str]):
+        with self._lock:
+            entry = self._sheet(sheet_id, title)
+            if modified_time:
+                entry["idle"] = {"modified_time": modified_time, "checked_at": time.time()}
+            else:
+                entry.pop("idle", None)
+
+
+_google_cache = None
+_google_client = None
+_google_credentials_json = None
+_google_client_lock = threading.Lock()
+
+
+def google_cache() -> GoogleCache:
+    global _google_cache
+    with _google_client_lock:
+        if _google_cache is None:
+            _google_cache = GoogleCache()
+        return _google_cache
+
+
+def google_client():
+    """구글 인증 1회 → 프로세스 공용 gspread 클라이언트 (여러 시트가 같은 인증/연결 사용)
+    
+    gspread/google-auth는 여기서 처음 로드, 캐시된 토큰이 유효하면 토큰 교환 생략 (만료되면 자동 갱신)
+    """
+    global _google_client, _google_credentials_json
+    cache = google_cache()
+    with _google_client_lock:
+        if _google_client is None:
+            import gspread
+            from google.oauth2.service_account import Credentials
+            
+            _google_credentials_json = _credentials_json()
+            credentials = Credentials.from_service_account_info(json.loads(_google_credentials_json), scopes=GOOGLE_SCOPES)
+            cached = cache.token(_google_credentials_json)
+            if cached:
+                credentials.token, credentials.expiry = cached
+            _google_client = gspread.authorize(credentials)
+        return _google_client
+
+
+def save_google_token():
+    """갱신된 토큰을 캐시 파일에 반영 (사이클 끝마다 호출, 바뀐 경우만 기록)"""
+    if _google_client is None:
+        return
+    credentials = _google_client.http_client.auth
+    cache = google_cache()
+    if credentials.token and credentials.expiry and cache.set_token(_google_credentials_json, credentials.token, credentials.expiry):
+        cache.save()
+
+
+def open_cached_worksheet(gc, sheet_id: str, properties: dict):
+    """캐시된 워크시트 정보로 핸들 생성 (스프레드시트 메타데이터 조회 생략)"""
+    from gspread.worksheet import Worksheet
+    properties = {key: value for key, value in properties.items() if key != "headers"}
+    return Worksheet(None, properties, spreadsheet_id=sheet_id, client=gc.http_client)
+
+
+def fetch_modified_time(sheet_id: str, session=None, token: str = None, transport: HttpTransport = None,
+                        limiter: AdaptiveRateLimiter = None) -> Optional[str]:
+    """스프레드시트 최종 수정 시각 (Drive API 1회, 실패 시 None)
+    
+    session: 인증된 세션 (gspread 클라이언트), 없으면 token으로 직접 요청
+    transport/limiter: 호출 통계와 속도 제한 (기본: 공용 TRANSPORT, GOVERNOR의 구글 시트 제한)
+    """
+    transport = transport or TRANSPORT
+    limiter = limiter or GOVERNOR["sheets"]
+    params = {"fields": "modifiedTime", "supportsAllDrives": "true"}
+    try:
+        if session is not None:
+            response = transport.get(DRIVE_FILE_URL.format(sheet_id), limiter=limiter, session=session, params=params)
+        else:
+            response = transport.get(DRIVE_FILE_URL.format(sheet_id), limiter=limiter, params=params,
+                                     headers={"Authorization": f"Bearer {token}"})
+        if response.status_code != 200:
+            return None
+        return response.json().get("modifiedTime")
+    except Exception as e:
+        logger.warning(f"시트 수정 시각 확인 실패: {e}")
+        return None
+
+
+def 빠른확인(sheet_id: str = GOOGLE_SHEET_ID, sheet_name: str = "수업 신청", journal_path: str = JOURNAL_PATH) -> bool:
+    """구글 시트 인증 없이 '처리할 것 없음'을 확인 (True면 바로 종료해도 됨)
+    
+    조건: 캐시된 토큰 유효 + 지난 전체 확인(FULL_CHECK_INTERVAL초 이내)에서 처리할 것 없었음
+         + 그 뒤 시트 수정 없음 + 저널에 미완료 발송 없음
+    """
+    cache = google_cache()
+    idle = cache.idle(sheet_id, sheet_name)
+    if not idle or time.time() - idle["checked_at"] > FULL_CHECK_INTERVAL:
+        return False
+    try:
+        cached = cache.token(_credentials_json())
+    except OSError:
+        return False
+    if not cached:
+        return False
+    if os.path.exists(journal_path) and SendJournal(journal_path).pending_count():
+        return False
+    return fetch_modified_time(sheet_id, token=cached[0]) == idle["modified_time"]
 
 
 ####---------- 메인 클래스 ----------####
@@ -240,6 +1621,8 @@ class ApplyChecker:
     """신청 확인 시스템"""
     
     ALIGO_URL = "https://apis.aligo.in"
+    ALIGO_MASS_MAX = 500                          # /send_mass/ 1회 최대 수신자 수
+    ALIGO_FAIL_STATES = ("실패", "오류", "거부")   # /sms_list/ sms_state 중 실패로 볼 값
     
     COLUMNS = {
         "timestamp": "Timestamp",
@@ -257,33 +1640,93 @@ class ApplyChecker:
         "price_adjustment": "가격조정"
     }
     
-    def __init__(self, sheet_id: str = None, sheet_name: str = "수업 신청"):
+    def __init__(self, sheet_id: str = None, sheet_name: str = "수업 신청", row_state_path: str = ROW_STATE_PATH,
+                 journal_path: str = JOURNAL_PATH, sheet=None, aligo_url: str = None, payssam_url: str = None,
+                 governor: RateGovernor = None, templates_path: str = TEMPLATES_PATH, name: str = "",
+                 metrics_path: str = METRICS_PATH, metrics_prom_path: str = METRICS_PROM_PATH, runner: AsyncRunner = None,
+                 transport: HttpTransport = None):
+        """sheet: 구글 시트 대신 쓸 워크시트 객체 (LocalSheet 등), 지정하면 구글 인증 생략
+        aligo_url/payssam_url: API 주소 교체 (시뮬레이션용 가짜 서버)
+        governor: 백엔드별 속도 제한 (기본: 프로세스 공용)
+        templates_path: 문자/청구서 문구 템플릿 (JSON)
+        name: 여러 시트를 함께 돌릴 때 대상 이름 (지표 target 라벨)
+        runner: 발송/사이클 코루틴을 돌릴 이벤트 루프 (기본: 프로세스 공용)
+        transport: 알리고/결제선생 HTTP 전송 (기본: 공용 연결 풀 + 이 checker만의 호출 통계)
+        """
+        self.name = name
+        self.sheet_name = sheet_name
         self.api_key = ALIGO_API_KEY
         self.user_id = ALIGO_USER_ID
         self.sender = ALIGO_SENDER
-        self.payssam = PaySsamAPI()
+        if aligo_url:
+            self.ALIGO_URL = aligo_url
+        self.transport = transport or TRANSPORT.scoped()
+        self.governor = governor or GOVERNOR
+        self.runner = runner or ASYNC
+        self.templates = TemplateStore(templates_path)
+        self.payssam = PaySsamAPI(transport=self.transport, base_url=payssam_url, limiter=self.governor["payssam"], runner=self.runner)
+        
+        self.sheet_stats = CallStats()
+        cached_headers = None
+        if sheet is not None:
+            self.gc = None
+            self.spreadsheet = None
+            self.sheet = MeteredSheet(sheet, self.sheet_stats, self.governor["sheets"])
+        else:
+            # 워크시트 ID/헤더가 캐시돼 있으면 스프레드시트 메타데이터/헤더 조회 없이 시작
+            self.gc = google_client()
+            self.spreadsheet_id = sheet_id or GOOGLE_SHEET_ID
+            self.spreadsheet = None
+            cached = google_cache().worksheet(self.spreadsheet_id, sheet_name)
+            if cached and "title" in cached:
+                self.sheet = MeteredSheet(open_cached_worksheet(self.gc, self.spreadsheet_id, cached),
+                                          self.sheet_stats, self.governor["sheets"])
+                cached_headers = cached.get("headers")
+            else:
+                self._open_worksheet()
         
-        sheet_id = sheet_id or GOOGLE_SHEET_ID
+        # 워크시트 핸들과 열 위치는 계속 재사용, 매 사이클 조회하는 1행(헤더) 해시가 바뀔 때만 다시 계산
+        self.col_index = {}
+        self._header_hash = None
+        self._load_column_index(cached_headers)
         
-        scopes = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+        # 셀 기록은 모았다가 사이클 끝(또는 SHEET_WRITE_BATCH개)마다 한 번에 반영
+        self.writes = SheetWriteBuffer(self.sheet)
+        self._flushing = False
+        atexit.register(self.flush_writes)
         
-        # 환경변수에서 credentials JSON 로드 (GitHub Actions용)
-        google_creds_json = os.environ.get("GOOGLE_CREDENTIALS_JSON")
-        if google_creds_json:
-            creds_dict = json.loads(google_creds_json)
-            credentials = Credentials.from_service_account_info(creds_dict, scopes=scopes)
-        else:
-            credentials = Credentials.from_service_account_file(CREDENTIALS_PATH, scopes=scopes)
+        # check_and_send 1사이클 동안 공유하는 지원자 스냅샷 (문자/청구서/가격조정 공용, 나눠 읽을 때는 현재 구간)
+        self.chunk_rows = SHEET_CHUNK_ROWS
+        self._last_row = 0
+        self._snapshot: Optional[List[Applicant]] = None
+        self._store: Optional[ApplicantStore] = None
+        self.row_state = RowStateStore(row_state_path)
         
-        self.gc = gspread.authorize(credentials)
-        self.spreadsheet = self.gc.open_by_key(sheet_id)
-        self.sheet = self.spreadsheet.worksheet(sheet_name)
+        # 발송 전 기록 → 시트 반영 후 완료 처리, 시트 반영 대기 중인 저널 id
+        self.journal = SendJournal(journal_path)
+        self._journal_unflushed: List[int] = []
+        self._held = set()  # 저널 복구에서 결과를 아직 확인 못 한 발송 (kind, 수신번호, 항목)
         
-        self.col_index = {}
-        self._load_column_index()
+        # 결제 결과 통보 (bill_id → 최신 상태), 같은 청구서의 연속 통보는 마지막 것만 다음 사이클에 한 번에 기록
+        self._payment_updates = {}
+        self._payment_lock = threading.Lock()
+        
+        # 사이클 지표 내보내기, 프로파일링 (PROFILE=1 또는 실행 중 SIGUSR1 / POST /profile로 전환)
+        self.metrics = MetricsExporter(metrics_path, metrics_prom_path, labels={"target": name} if name else None)
+        self.profiling = os.environ.get("PROFILE") == "1"
+    
+    @staticmethod
+    def _hash_headers(headers: list) -> str:
+        return hashlib.sha1("\x1f".join(str(h).strip() for h in headers).encode()).hexdigest()
     
-    def _load_column_index(self):
-        headers = self.sheet.row_values(1)
+    def _load_column_index(self, headers: list = None):
+        """헤더 → 열 번호 (headers 생략 시 1행 조회)"""
+        if headers is None:
+            headers = self.sheet.row_values(1)
+        self._header_hash = self._hash_headers(headers)
+        if self.gc:
+            google_cache().set_worksheet(self.spreadsheet_id, self.sheet_name, {}, headers=headers)
+        self.col_index = {}
         for idx, header in enumerate(headers, 1):
             for key, col_name in self.COLUMNS.items():
                 if header.strip() == col_name:
@@ -294,337 +1737,1316 @@ class ApplyChecker:
         self.col_index.setdefault("bill_id", 16)
         self.col_index.setdefault("price_adjustment", 18)  # R열
     
-    def _get_cell(self, row: dict, key: str) -> str:
-        return str(row.get(self.COLUMNS.get(key, ""), "")).strip()
+    def _refresh_column_index(self, headers: list):
+        """조회한 1행이 지난번과 다르면 열 위치 다시 계산 (추가 API 호출 없음)"""
+        if self._hash_headers(headers) == self._header_hash:
+            return
+        logger.info("시트 헤더 변경 감지 → 열 위치 다시 계산")
+        old_index = dict(self.col_index)
+        self._load_column_index(headers)
+        if self.writes:
+            # 대기 중인 기록은 예전 열 위치 기준 → 같은 항목의 새 열로 옮김 (시트는 이미 새 헤더라 그대로 쓰면 엉뚱한 열에 기록)
+            dropped = self.writes.remap_columns({col: self.col_index.get(key) for key, col in old_index.items()})
+            if dropped:
+                logger.warning(f"열이 사라져 기록 못 한 셀 {dropped}개 (발송 기록은 저널 복구로 다시 반영)")
+    
+    def _open_worksheet(self):
+        """스프레드시트 메타데이터 조회 후 워크시트 열기 (처음 1회, 또는 삭제 후 재생성 등으로 기존 핸들이 무효할 때)"""
+        self.spreadsheet = self.gc.open_by_key(self.spreadsheet_id)
+        worksheet = self.spreadsheet.worksheet(self.sheet_name)
+        google_cache().set_worksheet(self.spreadsheet_id, self.sheet_name, {
+            "sheetId": worksheet.id,
+            "title": worksheet.title,
+            "index": worksheet.index,
+            "gridProperties": {"rowCount": worksheet.row_count, "columnCount": worksheet.col_count},
+        })
+        self.sheet = MeteredSheet(worksheet, self.sheet_stats, self.governor["sheets"])
+        if getattr(self, "writes", None) is not None:
+            self.writes.sheet = self.sheet
+    
+    def _get_cell(self, values: list, key: str, strip: bool = True) -> str:
+        idx = self.col_index.get(key)
+        if not idx or idx - 1 >= len(values):
+            return ""
+        value = str(values[idx - 1])
+        return value.strip() if strip else value
+    
+    def _get_values(self, range_name: str = None) -> List[List[str]]:
+        try:
+            return self.sheet.get_values(range_name)
+        except Exception as e:
+            if not self.gc:
+                raise
+            from gspread.exceptions import APIError
+            if not isinstance(e, APIError):
+                raise
+            logger.warning("워크시트 조회 실패 → 다시 열어서 재시도")
+            self._open_worksheet()
+            return self.sheet.get_values(range_name)
+    
+    def _fetch_applicants(self) -> List[Applicant]:
+        """시트 전체 범위를 1회 조회해서 지원자 목록 생성"""
+        values = self._get_values()
+        self._last_row = len(values)
+        if values:
+            self._refresh_column_index(values[0])
+        return self._parse_rows(values[1:], 2)
+    
+    def _read_chunk(self, start: int, rows: int) -> Tuple[List[Applicant], Optional[int]]:
+        """start행부터 rows행 조회 → (지원자 목록, 다음 시작 행 또는 None)
+        
+        1행(헤더)이 포함된 첫 구간에서 열 위치 확인, 끝의 빈 행은 응답에서 빠지므로 덜 채워진 구간이 마지막
+        """
+        values = self._get_values(f"{start}:{start + rows - 1}")
+        if values:
+            self._last_row = start + len(values) - 1
+        elif start == 1:
+            self._last_row = 0
+        # 중간에 빈 행이 구간 하나보다 길게 이어지는 경우 대비, 그리드 행 수까지는 계속 읽음
+        more = len(values) >= rows or start + rows <= (getattr(self.sheet, "row_count", 0) or 0)
+        
+        first = start
+        if start == 1 and values:
+            self._refresh_column_index(values[0])
+            values, first = values[1:], 2
+        return self._parse_rows(values, first), (start + rows if more else None)
+    
+    def iter_applicant_chunks(self, rows: int = None):
+        """rows행씩 나눠 읽으면서 구간별 지원자 목록을 차례로 반환 (메모리에는 한 구간만, rows=0이면 한 번에 전체)"""
+        rows = self.chunk_rows if rows is None else rows
+        if not rows:
+            yield self._fetch_applicants()
+            return
+        start = 1
+        while start:
+            applicants, start = self._read_chunk(start, rows)
+            yield applicants
+    
+    def iter_applicants(self, rows: int = None):
+        """지원자를 시트 순서대로 하나씩 (구간 단위 조회)"""
+        for chunk in self.iter_applicant_chunks(rows):
+            yield from chunk
+    
+    async def _stream_chunks_async(self, rows: int = None):
+        """iter_applicant_chunks의 비동기 버전 - 받은 구간을 처리하는 동안 다음 구간을 미리 조회"""
+        rows = self.chunk_rows if rows is None else rows
+        if not rows:
+            yield await self.runner.call("sheets", self._fetch_applicants)
+            return
+        pending = asyncio.ensure_future(self.runner.call("sheets", self._read_chunk, 1, rows))
+        try:
+            while pending:
+                applicants, start = await pending
+                pending = asyncio.ensure_future(self.runner.call("sheets", self._read_chunk, start, rows)) if start else None
+                yield applicants
+        finally:
+            # 중간에 닫히면 (사이클 오류/취소) 미리 조회 중인 구간을 버림
+            if pending and not pending.done():
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
     
-    def get_all_applicants(self) -> List[Applicant]:
-        records = self.sheet.get_all_records()
-        status_col = self.sheet.col_values(self.col_index["payment_status"])
-        sms_col = self.sheet.col_values(self.col_index["sms_sent"])
-        bill_sent_col = self.sheet.col_values(self.col_index["bill_sent"])
-        bill_id_col = self.sheet.col_values(self.col_index["bill_id"])
-        price_adj_col = self.sheet.col_values(self.col_index["price_adjustment"])
-        
+    def _parse_rows(self, values: List[List[str]], first_row: int) -> List[Applicant]:
+        # 선택지/구분/결제 상태처럼 행마다 반복되는 문자열은 intern → 수만 행이어도 한 벌만 보관
+        intern = sys.intern
         applicants = []
-        for idx, row in enumerate(records, 2):
+        for idx, row in enumerate(values, first_row):
             app = Applicant(
                 timestamp=self._get_cell(row, "timestamp"),
-                user_type=self._get_cell(row, "user_type"),
+                user_type=intern(self._get_cell(row, "user_type")),
                 student_name=self._get_cell(row, "student_name"),
                 parent_phone=self._get_cell(row, "parent_phone"),
                 student_phone=self._get_cell(row, "student_phone"),
                 row_num=idx,
-                surinonseul_regular=self._get_cell(row, "surinonseul_regular"),
-                surinonseul_trial=self._get_cell(row, "surinonseul_trial"),
-                suneung_regular=self._get_cell(row, "suneung_regular"),
-                existing_status=status_col[idx-1] if idx-1 < len(status_col) else "",
-                existing_sms=sms_col[idx-1] if idx-1 < len(sms_col) else "",
-                existing_bill_sent=bill_sent_col[idx-1] if idx-1 < len(bill_sent_col) else "",
-                existing_bill_id=bill_id_col[idx-1] if idx-1 < len(bill_id_col) else "",
-                price_adjustment=price_adj_col[idx-1] if idx-1 < len(price_adj_col) else ""
+                surinonseul_regular=intern(self._get_cell(row, "surinonseul_regular")),
+                surinonseul_trial=intern(self._get_cell(row, "surinonseul_trial")),
+                suneung_regular=intern(self._get_cell(row, "suneung_regular")),
+                existing_status=intern(self._get_cell(row, "payment_status", strip=False)),
+                existing_sms=self._get_cell(row, "sms_sent", strip=False),
+                existing_bill_sent=self._get_cell(row, "bill_sent", strip=False),
+                existing_bill_id=self._get_cell(row, "bill_id", strip=False),
+                price_adjustment=self._get_cell(row, "price_adjustment", strip=False)
             )
             if app.primary_phone:
                 applicants.append(app)
         return applicants
     
+    def get_all_applicants(self) -> List[Applicant]:
+        """사이클 진행 중이면 스냅샷 재사용, 아니면 새로 조회"""
+        if self._snapshot is not None:
+            return self._snapshot
+        return self._fetch_applicants()
+    
+    def _applicant_store(self) -> ApplicantStore:
+        """스냅샷 기준 판정 집합 (스냅샷이 바뀌었을 때만 새로 만듦)"""
+        applicants = self.get_all_applicants()
+        if self._store is None or self._store.source is not applicants:
+            self._store = ApplicantStore(applicants)
+        return self._store
+    
     def get_new_applicants(self) -> List[Applicant]:
-        return [app for app in self.get_all_applicants() if app.get_pending_sms_items()]
+        store = self._applicant_store()
+        return store.select(store.needs_sms)
     
     def get_bill_pending_applicants(self) -> List[Applicant]:
-        pending = []
-        for app in self.get_all_applicants():
-            if any(item.bill_type in app.existing_sms for item in app.get_pending_bill_items()):
-                pending.append(app)
-        return pending
+        store = self._applicant_store()
+        return store.select(store.needs_bill)
     
     def get_price_adjustment_applicants(self) -> List[Applicant]:
         """가격조정이 필요한 학생 목록 (R열에 값이 있는 학생)"""
-        return [app for app in self.get_all_applicants() if app.adjustment_amount != 0]
+        store = self._applicant_store()
+        return store.select(store.needs_adjust)
+    
+    def _refresh_store(self, app: Applicant):
+        if self._store is not None:
+            self._store.refresh(app)
     
     def _update_cell(self, row: int, col_key: str, value: str):
         if col_key in self.col_index:
-            self.sheet.update_cell(row, self.col_index[col_key], value)
+            self.writes.add(row, self.col_index[col_key], value, auto_flush=not self.runner.in_loop())
+    
+    def flush_writes(self) -> int:
+        """대기 중인 시트 기록 반영 (실패하면 버퍼에 남겨두고 다음에 재시도)"""
+        # 저널 id를 먼저 가져옴 → 기록 중에 (루프에서) 추가된 발송은 다음 반영 때 완료 처리
+        done, self._journal_unflushed = self._journal_unflushed, []
+        try:
+            count = self.writes.flush()
+        except Exception as e:
+            self._journal_unflushed = done + self._journal_unflushed
+            logger.error(f"시트 기록 실패 ({len(self.writes)}셀 대기): {e}")
+            return 0
+        if count:
+            logger.info(f"시트 기록 {count}셀 반영")
+        
+        # 시트 반영이 확인된 발송만 저널에서 완료 처리
+        self.journal.mark_done(done)
+        return count
+    
+    async def _flush_if_full_async(self):
+        """발송 도중 쌓인 기록이 SHEET_WRITE_BATCH개를 넘으면 스레드 풀에서 반영 (루프는 계속 발송)"""
+        if self.writes.full() and not self._flushing:
+            self._flushing = True
+            try:
+                await self.runner.call("sheets", self.flush_writes)
+            finally:
+                self._flushing = False
+    
+    def _find_journal_applicant(self, entry: JournalEntry, by_row: dict) -> Optional[Applicant]:
+        """저널 항목의 학생 찾기 (행이 밀렸으면 연락처 + 신청 항목으로 다시 찾음)"""
+        app = by_row.get(entry.row_num)
+        if app and app.primary_phone == entry.phone:
+            return app
+        for app in by_row.values():
+            if app.primary_phone == entry.phone and app.get_bill_item(entry.bill_type):
+                return app
+        return None
+    
+    def _replay_journal(self, applicants: List[Applicant]):
+        self.runner.run(self._replay_journal_async(applicants))
+    
+    async def _replay_journal_async(self, applicants: List[Applicant]):
+        """지난 실행에서 발송했지만 시트에 반영되지 않은 기록 복구 (재발송 없이 시트만 기록)"""
+        entries = self.journal.unfinished()
+        self._held = set()
+        if not entries:
+            return
+        
+        logger.info(f"[저널] 미완료 발송 {len(entries)}건 복구")
+        by_row = {app.row_num: app for app in applicants}
+        held = set()   # 아직 확인 못 한 발송 (kind, 수신번호, 항목) → 이번 사이클 발송에서 제외
+        lookups = {}   # 알리고 전송 내역 조회 캐시
+        for entry in entries:
+            app = self._find_journal_applicant(entry, by_row)
+            if app is None:
+                logger.warning(f"  행 {entry.row_num} {entry.bill_type} ({entry.kind}) - 시트에서 학생을 찾을 수 없음, 복구 불가")
+                self.journal.mark_failed(entry.id)
+                continue
+            
+            if entry.kind == "sms":
+                if entry.status != "sent":
+                    # 발송 결과 불명 → 알리고 전송 내역에서 확인된 경우만 기록, 안 보내졌을 때만 다시 발송 대상
+                    delivered = await self._sms_delivered_async(entry, lookups)
+                    if delivered is None:
+                        logger.warning(f"  {app.student_name} {entry.bill_type} - 문자 전송 내역 확인 불가, 다음 사이클에 재확인")
+                        held.add((entry.kind, entry.phone, entry.bill_type))
+                        continue
+                    if not delivered:
+                        logger.warning(f"  {app.student_name} {entry.bill_type} - 문자 발송 안 됨 (전송 내역 확인), 다시 발송 대상")
+                        self.journal.mark_failed(entry.id)
+                        continue
+                    logger.info(f"  {app.student_name} {entry.bill_type} - 문자 발송 확인 (전송 내역)")
+                if not app.has_sms(entry.bill_type):
+                    self.append_sms_record(app, entry.bill_type)
+            
+            elif entry.kind == "bill":
+                if entry.status != "sent":
+                    # 결제선생에 그 bill_id가 있으면 발송된 것, 없을 때만 같은 bill_id로 다시 발송
+                    delivered = await self._confirm_bill_async(entry.ref, entry.payload)
+                    if delivered is None:
+                        logger.warning(f"  {app.student_name} {entry.bill_type} - 청구서 확인 불가, 다음 사이클에 재시도")
+                        held.add((entry.kind, entry.phone, entry.bill_type))
+                        continue
+                    if not delivered:
+                        logger.warning(f"  {app.student_name} {entry.bill_type} - 청구서 거절 (bill_id: {entry.ref}), 다시 발송 대상")
+                        self.journal.mark_failed(entry.id)
+                        continue
+                    logger.info(f"  {app.student_name} {entry.bill_type} - 청구서 발송 확인 (bill_id: {entry.ref})")
+                if not app.has_bill(entry.bill_type):
+                    self.append_bill_record(app, entry.bill_type, entry.ref)
+            
+            elif entry.kind == "adjust":
+                if entry.status != "sent":
+                    # 파기 → 발송 순서 그대로 다시 (파기 응답을 못 받으면 다음에 재시도, 거절은 이미 파기/결제된 것이라 발송 진행)
+                    payload = dict(entry.payload)
+                    old_bill_id = payload.pop("old_bill_id", "")
+                    exists = await self.payssam.bill_exists_async(entry.ref)
+                    if exists is None:
+                        logger.warning(f"  {app.student_name} {entry.bill_type} - 조정 청구서 확인 불가, 다음에 재시도")
+                        held.add((entry.kind, entry.phone, entry.bill_type))
+                        continue
+                    if not exists:
+                        if old_bill_id:
+                            destroy_result = await self.payssam.destroy_bill_async(old_bill_id)
+                            if not destroy_result.success and not destroy_result.code:
+                                logger.warning(f"  {app.student_name} {entry.bill_type} - 기존 청구서 파기 재시도 실패, 다음에 재시도: {destroy_result.message}")
+                                held.add((entry.kind, entry.phone, entry.bill_type))
+                                continue
+                        delivered = await self._confirm_bill_async(entry.ref, payload, checked=True)
+                        if delivered is None:
+                            logger.warning(f"  {app.student_name} {entry.bill_type} - 조정 청구서 확인 불가, 다음에 재시도")
+                            held.add((entry.kind, entry.phone, entry.bill_type))
+                            continue
+                        if not delivered:
+                            logger.warning(f"  {app.student_name} {entry.bill_type} - 조정 청구서 거절 (bill_id: {entry.ref}), 다시 조정 대상")
+                            self.journal.mark_failed(entry.id)
+                            continue
+                    logger.info(f"  {app.student_name} {entry.bill_type} - 조정 청구서 발송 확인 (bill_id: {entry.ref})")
+                if app.get_existing_bill_ids().get(entry.bill_type) != entry.ref:
+                    self.update_bill_record(app, entry.bill_type, entry.ref)
+                if app.adjustment_amount != 0:
+                    self.clear_price_adjustment(app)
+            
+            self._journal_unflushed.append(entry.id)
+        self._held = held
+    
+    async def _confirm_bill_async(self, bill_id: str, payload: dict, checked: bool = False) -> Optional[bool]:
+        """결과를 모르는 청구서 확인 - 조회해서 없으면 같은 bill_id로 다시 발송
+        
+        True 발송됨 / False 거절됨 / None 아직 확인 불가, checked=True: 없다는 것을 이미 조회함
+        거절 코드만으로 중복 여부를 판단하지 않음 → 거절되면 다시 조회해서 그 사이 등록됐는지 확인
+        """
+        if not checked:
+            exists = await self.payssam.bill_exists_async(bill_id)
+            if exists is not False:
+                return exists
+        result = await self.payssam.send_bill_async(bill_id=bill_id, **payload)
+        if result.success:
+            return True
+        if not result.code:
+            return None
+        logger.warning(f"  청구서 재발송 거절 (bill_id: {bill_id}) [{result.code}] {result.message}")
+        return await self.payssam.bill_exists_async(bill_id)
     
     def append_sms_record(self, app: Applicant, bill_type: str):
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        new_sms = f"{bill_type} {now}"
-        if app.existing_sms.strip():
-            new_sms = f"{app.existing_sms}\n{new_sms}"
-        self._update_cell(app.row_num, "sms_sent", new_sms)
-        app.existing_sms = new_sms
+        app.record_sms(bill_type, now)
+        self._refresh_store(app)
+        self._update_cell(app.row_num, "sms_sent", app.existing_sms)
     
     def append_bill_record(self, app: Applicant, bill_type: str, bill_id: str):
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        new_sent = f"{bill_type} {now}"
-        if app.existing_bill_sent.strip():
-            new_sent = f"{app.existing_bill_sent}\n{new_sent}"
-        self._update_cell(app.row_num, "bill_sent", new_sent)
-        
-        new_id = f"{bill_type} {bill_id}"
-        if app.existing_bill_id.strip():
-            new_id = f"{app.existing_bill_id}\n{new_id}"
-        self._update_cell(app.row_num, "bill_id", new_id)
-        
-        app.existing_bill_sent = new_sent
-        app.existing_bill_id = new_id
+        app.record_bill(bill_type, bill_id, now)
+        self._refresh_store(app)
+        self._update_cell(app.row_num, "bill_sent", app.existing_bill_sent)
+        self._update_cell(app.row_num, "bill_id", app.existing_bill_id)
     
     def update_bill_record(self, app: Applicant, bill_type: str, new_bill_id: str):
-        """기존 청구서 ID를 새 ID로 교체"""
+        """기존 청구서 ID를 새 ID로 교체 (bill_sent에는 조정 기록 추가)"""
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # bill_sent 업데이트 (새 기록 추가)
-        new_sent = f"{bill_type}(조정) {now}"
-        if app.existing_bill_sent.strip():
-            new_sent = f"{app.existing_bill_sent}\n{new_sent}"
-        self._update_cell(app.row_num, "bill_sent", new_sent)
-        
-        # bill_id 업데이트 (기존 ID 교체)
-        lines = app.existing_bill_id.strip().split("\n") if app.existing_bill_id.strip() else []
-        new_lines = []
-        replaced = False
-        for line in lines:
-            if line.startswith(bill_type + " "):
-                new_lines.append(f"{bill_type} {new_bill_id}")
-                replaced = True
-            else:
-                new_lines.append(line)
-        if not replaced:
-            new_lines.append(f"{bill_type} {new_bill_id}")
-        
-        new_id = "\n".join(new_lines)
-        self._update_cell(app.row_num, "bill_id", new_id)
-        
-        app.existing_bill_sent = new_sent
-        app.existing_bill_id = new_id
+        app.record_bill(bill_type, new_bill_id, now, adjusted=True)
+        self._refresh_store(app)
+        self._update_cell(app.row_num, "bill_sent", app.existing_bill_sent)
+        self._update_cell(app.row_num, "bill_id", app.existing_bill_id)
     
     def clear_price_adjustment(self, app: Applicant):
         """가격조정 셀 비우기 (처리 완료 후)"""
         self._update_cell(app.row_num, "price_adjustment", "")
         app.price_adjustment = ""
+        self._refresh_store(app)
+    
+    def queue_payment_status(self, bill_id: str, status: str):
+        """결제 결과 통보 접수 (시트 기록은 다음 사이클에 모아서)"""
+        with self._payment_lock:
+            self._payment_updates[bill_id] = status
     
-    def _send_sms(self, phone: str, message: str) -> SMSResult:
+    def _set_payment_status(self, app: Applicant, bill_type: str, status: str) -> bool:
+        if not app.record_payment(bill_type, status):
+            return False
+        self._update_cell(app.row_num, "payment_status", app.existing_status)
+        return True
+    
+    def _take_payment_updates(self) -> dict:
+        with self._payment_lock:
+            updates, self._payment_updates = self._payment_updates, {}
+        return updates
+    
+    def _requeue_payment_updates(self, updates: dict):
+        """사이클이 중간에 실패하면 반영 못 한 통보를 되돌림 (그 사이 새로 온 통보가 우선)"""
+        with self._payment_lock:
+            for bill_id, status in updates.items():
+                self._payment_updates.setdefault(bill_id, status)
+    
+    @staticmethod
+    def _drop_payment_updates(updates: dict):
+        """시트에서 bill_id를 못 찾은 통보는 버림 (조정으로 교체된 청구서 등)"""
+        for bill_id, status in updates.items():
+            logger.warning(f"[결제] 시트에 없는 청구서 {bill_id} ({status}) - 무시")
+    
+    def _apply_payment_updates(self, applicants: List[Applicant], updates: dict) -> int:
+        """접수된 결제 상태 중 applicants에 있는 청구서를 시트 기록 버퍼에 반영 (반영한 것은 updates에서 뺌)"""
+        if not updates:
+            return 0
+        
+        by_bill_id = {}
+        for app in applicants:
+            for bill_type, record in app.get_bill_records().items():
+                if record.bill_id in updates:
+                    by_bill_id[record.bill_id] = (app, bill_type)
+        
+        changed = 0
+        for bill_id, (app, bill_type) in by_bill_id.items():
+            status = updates.pop(bill_id)
+            if self._set_payment_status(app, bill_type, status):
+                logger.info(f"[결제] {app.student_name} {bill_type} → {status}")
+                changed += 1
+        return changed
+    
+    def sync_payment_status(self) -> dict:
+        return self.runner.run(self.sync_payment_status_async())
+    
+    async def sync_payment_status_async(self) -> dict:
+        """놓친 결제 통보 보정 - 상태가 확정되지 않은 청구서를 결제선생에 동시 조회 (payssam 동시 요청 수/속도 제한 공유)"""
+        results = {"checked": 0, "updated": 0, "fail": 0}
+        chunks = self._stream_chunks_async()
+        try:
+            async for applicants in chunks:
+                targets = []
+                for app in applicants:
+                    statuses = app.get_payment_statuses()
+                    for bill_type, record in app.get_bill_records().items():
+                        if record.bill_id and statuses.get(bill_type) not in FINAL_PAYMENT_STATES:
+                            targets.append((app, bill_type, record.bill_id))
+                
+                results["checked"] += len(targets)
+                logger.info(f"[결제 동기화] 조회 대상 청구서 {len(targets)}건")
+                replies = await asyncio.gather(*(self.payssam.read_bill_async(bill_id) for _, _, bill_id in targets))
+                
+                for (app, bill_type, bill_id), reply in zip(targets, replies):
+                    if not reply.success or not reply.status:
+                        logger.warning(f"  {app.student_name} {bill_type} ({bill_id}) 조회 실패: [{reply.code}] {reply.message}")
+                        results["fail"] += 1
+                    elif self._set_payment_status(app, bill_type, reply.status):
+                        logger.info(f"  {app.student_name} {bill_type} → {reply.status}")
+                        results["updated"] += 1
+                await self._flush_if_full_async()
+        finally:
+            await chunks.aclose()
+        return results
+    
+    def _send_sms(self, phone: str, message: Union[str, RenderedMessage]) -> SMSResult:
+        return self.runner.run(self._send_sms_async(phone, message))
+    
+    async def _aligo_post_async(self, path: str, data: dict, idempotent: bool = False) -> dict:
+        response = await self.runner.call("aligo", self.transport.post, f"{self.ALIGO_URL}{path}", idempotent=idempotent,
+                                          limiter=self.governor["aligo"], data=data)
+        return response.json()
+    
+    async def _send_sms_async(self, phone: str, message: Union[str, RenderedMessage]) -> SMSResult:
+        """단건 발송 (/send/) - message: 템플릿으로 만든 문구 또는 그냥 문자열 (길이로 SMS/LMS 판단)"""
+        if isinstance(message, str):
+            message = RenderedMessage(message, euckr_len(message))
         data = {
             "key": self.api_key,
             "user_id": self.user_id,
             "sender": self.sender,
             "receiver": phone,
-            "msg": message,
+            "msg": message.text,
         }
-        if len(message.encode('euc-kr', errors='replace')) > 90:
+        if message.msg_type == "LMS":
             data["msg_type"] = "LMS"
         
         try:
-            response = requests.post(f"{self.ALIGO_URL}/send/", data=data)
-            result = response.json()
+            result = await self._aligo_post_async("/send/", data)
             if int(result.get("result_code", 0)) > 0:
                 return SMSResult(success=True, msg_id=result.get("msg_id", 0), message="발송 성공")
             return SMSResult(success=False, message=result.get("message", "알 수 없는 오류"))
         except Exception as e:
             return SMSResult(success=False, message=str(e))
     
+    async def _send_sms_mass_async(self, messages: List[Tuple[str, str]], msg_type: str) -> List[SMSResult]:
+        """대량 발송 (/send_mass/) - [(수신번호, 내용)] 최대 500건, 수신번호는 중복 불가
+        
+        수신자별 결과를 입력 순서대로 반환
+        """
+        data = {
+            "key": self.api_key,
+            "user_id": self.user_id,
+            "sender": self.sender,
+            "cnt": len(messages),
+            "msg_type": msg_type,
+        }
+        for i, (phone, message) in enumerate(messages, 1):
+            data[f"rec_{i}"] = phone
+            data[f"msg_{i}"] = message
+        
+        try:
+            result = await self._aligo_post_async("/send_mass/", data)
+        except Exception as e:
+            # 요청이 알리고에 닿았는지 모르면 실패로 단정하지 않음 (다음 사이클에 전송 내역으로 확인)
+            unknown = not HttpTransport._not_sent(e)
+            return [SMSResult(success=False, message=str(e), unknown=unknown) for _ in messages]
+        
+        if int(result.get("result_code", 0)) <= 0:
+            return [SMSResult(success=False, message=result.get("message", "알 수 없는 오류")) for _ in messages]
+        
+        msg_id = result.get("msg_id", 0)
+        error_cnt = int(result.get("error_cnt", 0) or 0)
+        if error_cnt == 0:
+            return [SMSResult(success=True, msg_id=msg_id, message="발송 성공") for _ in messages]
+        if error_cnt >= len(messages):
+            return [SMSResult(success=False, msg_id=msg_id, message="전체 발송 실패") for _ in messages]
+        
+        # 일부 실패 → 전송 내역에서 실패한 수신번호 확인
+        failed = await self._failed_receivers_async(msg_id)
+        if failed is None:
+            # 전체를 실패로 보면 이미 받은 사람에게 중복 문자 → 다음 사이클에 같은 msg_id로 다시 조회해서 실패한 번호만 재발송
+            logger.warning(f"대량 발송 {error_cnt}건 실패, 수신자별 결과 조회 불가 (msg_id: {msg_id}) → 다음 사이클에 재조회")
+            return [SMSResult(success=False, msg_id=msg_id, message="수신자별 결과 확인 불가", unknown=True) for _ in messages]
+        return [
+            SMSResult(success=False, msg_id=msg_id, message="수신 실패") if phone in failed
+            else SMSResult(success=True, msg_id=msg_id, message="발송 성공")
+            for phone, _ in messages
+        ]
+    
+    async def _failed_receivers_async(self, msg_id) -> Optional[set]:
+        """전송 내역 조회 (/sms_list/) → 실패한 수신번호 집합, 조회 실패 시 None"""
+        states = await self._delivery_states_async(msg_id)
+        if states is None:
+            return None
+        return {phone for phone, failed in states.items() if failed}
+    
+    async def _delivery_states_async(self, msg_id) -> Optional[dict]:
+        """전송 내역 조회 (/sms_list/) → {수신번호: 실패 여부}, 조회 실패 시 None"""
+        data = {
+            "key": self.api_key,
+            "user_id": self.user_id,
+            "mid": msg_id,
+            "page_size": self.ALIGO_MASS_MAX,
+        }
+        try:
+            result = await self._aligo_post_async("/sms_list/", data, idempotent=True)
+        except Exception as e:
+            logger.error(f"전송 내역 조회 실패: {e}")
+            return None
+        if int(result.get("result_code", 0)) <= 0:
+            return None
+        
+        states = {}
+        for row in result.get("list", []):
+            state = str(row.get("sms_state", ""))
+            phone = ''.join(c for c in str(row.get("receiver", "")) if c.isdigit())
+            states[phone] = any(s in state for s in self.ALIGO_FAIL_STATES)
+        return states
+    
+    async def _recent_msg_ids_async(self, since: str) -> Optional[List[str]]:
+        """since(저널 기록 시각) 이후 등록된 발송 건의 msg_id (/list/), 조회 실패 시 None"""
+        mids = []
+        page = 1
+        while True:
+            data = {
+                "key": self.api_key,
+                "user_id": self.user_id,
+                "page": page,
+                "page_size": self.ALIGO_MASS_MAX,
+                "start_date": since[:10].replace("-", ""),
+            }
+            try:
+                result = await self._aligo_post_async("/list/", data, idempotent=True)
+            except Exception as e:
+                logger.error(f"발송 목록 조회 실패: {e}")
+                return None
+            if int(result.get("result_code", 0)) <= 0:
+                return None
+            mids.extend(str(row.get("mid")) for row in result.get("list", []) if str(row.get("reg_date", "")) >= since)
+            if result.get("next_yn") != "Y":
+                return mids
+            page += 1
+    
+    async def _sms_delivered_async(self, entry: JournalEntry, cache: dict) -> Optional[bool]:
+        """발송 결과를 모르는 문자 저널 항목 확인 → True 발송됨 / False 발송 안 됨·수신 실패 / None 아직 확인 불가
+        
+        cache: 한 번의 복구에서 같은 조회를 반복하지 않도록 공유
+        """
+        if entry.ref:
+            mids = [entry.ref]
+        else:
+            # msg_id를 받기 전에 끊김 → 기록 시각 이후 발송 건 중 다른 저널 항목의 것이 아닌 msg_id에서 수신번호를 찾음
+            if entry.created_at not in cache:
+                cache[entry.created_at] = await self._recent_msg_ids_async(entry.created_at)
+            mids = cache[entry.created_at]
+            if mids is None:
+                return None
+            if "known" not in cache:
+                cache["known"] = self.journal.known_refs("sms")
+            mids = [mid for mid in mids if mid not in cache["known"]]
+        
+        for mid in mids:
+            if mid not in cache:
+                cache[mid] = await self._delivery_states_async(mid)
+            states = cache[mid]
+            if states is None:
+                return None
+            if entry.phone in states:
+                return not states[entry.phone]
+        # msg_id가 있는데 내역에 아직 없으면 다음에 다시 확인, 없으면 알리고에 닿지 않은 요청
+        return None if entry.ref else False
+    
+    def _registration_message(self, app: Applicant, item: BillItem) -> RenderedMessage:
+        return self.templates.render("registration", reason=item.reason, student_name=app.student_name)
+    
+    def _group_mass_batches(self, jobs: list) -> List[Tuple[str, list]]:
+        """(app, item, message) 목록을 SMS/LMS별, 500건 이하, 수신번호 중복 없는 묶음으로 분할"""
+        batches = {"SMS": [], "LMS": []}
+        for job in jobs:
+            app, _, message = job
+            type_batches = batches[message.msg_type]
+            for batch in type_batches:
+                if len(batch) < self.ALIGO_MASS_MAX and app.primary_phone not in batch:
+                    batch[app.primary_phone] = job
+                    break
+            else:
+                type_batches.append({app.primary_phone: job})
+        return [(msg_type, list(batch.values())) for msg_type, type_batches in batches.items() for batch in type_batches]
+    
     def send_registration_sms(self, applicants: List[Applicant] = None) -> dict:
-        """신청 확인 문자 발송"""
+        return self.runner.run(self.send_registration_sms_async(applicants))
+    
+    async def send_registration_sms_async(self, applicants: List[Applicant] = None, on_recorded=None) -> dict:
+        """신청 확인 문자 발송 (SMS/LMS별 대량 발송, 묶음 단위 동시 발송)
+        
+        on_recorded: 묶음마다 발송 성공한 [(app, item)]을 받는 콜백 (사이클에서 바로 청구서 발송으로 이어감)
+        """
         if applicants is None:
             applicants = self.get_new_applicants()
         
         results = {"success": 0, "fail": 0}
         
+        jobs = []
         for app in applicants:
             pending_items = app.get_pending_sms_items()
             logger.info(f"[신청문자] {app.student_name} - {len(pending_items)}건 / {app.primary_phone}")
-            
             for item in pending_items:
-                message = f"""{item.reason} 수업 신청
-
-{app.student_name}님 안녕하세요!!
-
-박교준 선생님의
-{item.reason} 수업을
-신청해주셔서 감사합니다.
-
-학부모님 카카오톡으로 결제선생이 발송되었습니다.
-● 수업 확정을 위해 수강료 납부 부탁드립니다.
-
-※ 납부 확인 즉시,
-수업 확정 안내드리겠습니다.
-★ 10명 중 9명이 합격한 수업
-
-이제 다음은 {app.student_name}님의 차례입니다."""
-                
-                logger.info(f"  {item.bill_type} ({item.price:,}원)")
-                result = self._send_sms(app.primary_phone, message)
-                
+                if ("sms", app.primary_phone, item.bill_type) in self._held:
+                    logger.warning(f"  {item.bill_type} - 이전 발송 결과 확인 중, 이번 사이클 건너뜀")
+                    continue
+                jobs.append((app, item, self._registration_message(app, item)))
+        
+        if not jobs:
+            return results
+        
+        batches = self._group_mass_batches(jobs)
+        logger.info(f"[신청문자] {len(jobs)}건 → 대량 발송 {len(batches)}회")
+        
+        # 발송 전에 저널 기록
+        journal_ids = [
+            self.journal.begin([("sms", app.row_num, app.primary_phone, item.bill_type, "", {}) for app, item, _ in batch])
+            for _, batch in batches
+        ]
+        
+        async def send_batch(msg_type: str, batch: list, ids: List[int]):
+            sent = await self._send_sms_mass_async([(app.primary_phone, message.text) for app, _, message in batch], msg_type)
+            
+            # 시트 기록은 루프 스레드에서만 (성공한 수신자만 기록, 끝난 묶음부터)
+            recorded = []
+            for (app, item, _), entry_id, result in zip(batch, ids, sent):
                 if result.success:
                     results["success"] += 1
-                    logger.info(f"    → 문자 발송 성공")
+                    logger.info(f"  {app.student_name} {item.bill_type} ({item.price:,}원) → 문자 발송 성공")
+                    self.journal.mark_sent(entry_id, str(result.msg_id))
                     self.append_sms_record(app, item.bill_type)
+                    self._journal_unflushed.append(entry_id)
+                    recorded.append((app, item))
+                elif result.unknown:
+                    results["fail"] += 1
+                    logger.warning(f"  {app.student_name} {item.bill_type} ({item.price:,}원) → 문자 발송 결과 불명, 전송 내역 확인 전까지 재발송 안 함: {result.message}")
+                    self.journal.mark_unknown(entry_id, str(result.msg_id) if result.msg_id else None)
                 else:
                     results["fail"] += 1
-                    logger.error(f"    → 문자 발송 실패: {result.message}")
-                time.sleep(0.5)
+                    logger.error(f"  {app.student_name} {item.bill_type} ({item.price:,}원) → 문자 발송 실패: {result.message}")
+                    self.journal.mark_failed(entry_id)
+            if recorded and on_recorded:
+                on_recorded(recorded)
+            await self._flush_if_full_async()
         
+        await asyncio.gather(*(send_batch(msg_type, batch, ids) for (msg_type, batch), ids in zip(batches, journal_ids)))
         return results
     
+    def _bill_payload(self, app: Applicant, item: BillItem) -> dict:
+        """send_bill 인자 (bill_id 제외)"""
+        return {
+            "product_nm": item.product_nm,
+            "message": self.templates.render("bill", student_name=app.student_name, product_nm=item.product_nm).text,
+            "member_nm": app.student_name,
+            "phone": app.primary_phone,
+            "price": str(item.price),
+        }
+    
     def send_bills(self, applicants: List[Applicant] = None) -> dict:
-        """청구서 발송"""
+        return self.runner.run(self.send_bills_async(applicants))
+    
+    async def send_bills_async(self, applicants: List[Applicant] = None) -> dict:
+        """청구서 발송 (학생별 동시 발송, 학생 안에서는 항목 순서 유지)"""
         if applicants is None:
             applicants = self.get_bill_pending_applicants()
-        
+        return await self._send_bill_items_async([(app, app.get_bill_ready_items()) for app in applicants])
+    
+    async def _send_bill_items_async(self, ready: List[Tuple[Applicant, List[BillItem]]]) -> dict:
+        """[(app, 발송할 항목)] 청구서 발송"""
         results = {"success": 0, "fail": 0}
+        # 이전 발송 결과를 확인 중인 항목은 이번 사이클 건너뜀 (새 bill_id로 보내면 청구서가 두 장)
+        ready = [(app, [item for item in items if ("bill", app.primary_phone, item.bill_type) not in self._held])
+                 for app, items in ready]
         
-        for app in applicants:
-            items_to_send = [item for item in app.get_pending_bill_items() if item.bill_type in app.existing_sms]
-            if not items_to_send:
-                continue
-            
-            logger.info(f"[청구서발송] {app.student_name} - {len(items_to_send)}건 / {app.primary_phone}")
+        # (app, [(item, bill_id, payload)]) - bill_id는 발송 전에 한꺼번에 발급해서 저널에 기록
+        bill_ids = iter(self.payssam.bill_ids.allocate_many(
+            [(app.row_num, f"{i+1:02d}") for app, items in ready for i in range(len(items))]
+        ))
+        jobs = []
+        for app, items in ready:
+            bills = [(item, next(bill_ids), self._bill_payload(app, item)) for item in items]
+            if bills:
+                jobs.append((app, bills))
+        
+        if not jobs:
+            return results
+        
+        journal_ids = [
+            self.journal.begin([("bill", app.row_num, app.primary_phone, item.bill_type, bill_id, payload) for item, bill_id, payload in bills])
+            for app, bills in jobs
+        ]
+        
+        async def send_applicant(app: Applicant, bills: list, ids: List[int]):
+            sent = []
+            for _, bill_id, payload in bills:
+                sent.append(await self.payssam.send_bill_async(bill_id=bill_id, **payload))
             
-            for i, item in enumerate(items_to_send):
-                bill_id = self.payssam._generate_bill_id(app.row_num, f"{i+1:02d}")
-                message = f"안녕하세요. {app.student_name}님의 {item.product_nm} 안내드립니다. 감사합니다."
-                
-                logger.info(f"  {item.bill_type} - {item.price:,}원")
-                
-                result = self.payssam.send_bill(
-                    bill_id=bill_id,
-                    product_nm=item.product_nm,
-                    message=message,
-                    member_nm=app.student_name,
-                    phone=app.primary_phone,
-                    price=str(item.price)
-                )
-                
+            # 시트 기록은 루프 스레드에서만 (버퍼에 모아 사이클 끝에 반영)
+            logger.info(f"[청구서발송] {app.student_name} - {len(sent)}건 / {app.primary_phone}")
+            for (item, _, _), entry_id, result in zip(bills, ids, sent):
                 if result.success:
                     results["success"] += 1
-                    logger.info(f"    → 성공 (bill_id: {result.bill_id})")
+                    logger.info(f"  {item.bill_type} - {item.price:,}원 → 성공 (bill_id: {result.bill_id})")
+                    self.journal.mark_sent(entry_id, result.bill_id)
                     self.append_bill_record(app, item.bill_type, result.bill_id)
+                    self._journal_unflushed.append(entry_id)
+                elif not result.code:
+                    # 응답을 못 받음 → 다음 사이클에 같은 bill_id로 확인
+                    results["fail"] += 1
+                    logger.warning(f"  {item.bill_type} - {item.price:,}원 → 결과 불명, 같은 bill_id로 다시 확인: {result.message}")
+                    self.journal.mark_unknown(entry_id)
                 else:
                     results["fail"] += 1
-                    logger.error(f"    → 실패: [{result.code}] {result.message}")
-                time.sleep(0.5)
+                    logger.error(f"  {item.bill_type} - {item.price:,}원 → 실패: [{result.code}] {result.message}")
+                    self.journal.mark_failed(entry_id)
+            await self._flush_if_full_async()
         
+        await asyncio.gather(*(send_applicant(app, bills, ids) for (app, bills), ids in zip(jobs, journal_ids)))
         return results
     
+    def _plan_adjustment(self, app: Applicant) -> Optional[list]:
+        """가격조정 대상 청구서 목록 [(bill_type, old_bill_id, new_price, new_bill_id, payload)], 기존 청구서가 없으면 None"""
+        adjustment = app.adjustment_amount
+        existing_bills = app.get_existing_bill_ids()
+        if not existing_bills:
+            logger.warning(f"[가격조정] {app.student_name} - 기존 청구서 없음, 건너뜀")
+            return None
+        
+        logger.info(f"[가격조정] {app.student_name} - 조정금액: {adjustment:+,}원 / {app.primary_phone}")
+        
+        plan = []
+        for bill_type, old_bill_id in existing_bills.items():
+            # 원래 가격 찾기
+            original_item = app.get_bill_item(bill_type)
+            if not original_item:
+                logger.warning(f"  {bill_type} - 원본 항목 찾을 수 없음")
+                continue
+            
+            original_price = original_item.price
+            new_price = original_price + adjustment
+            
+            if new_price <= 0:
+                logger.warning(f"  {bill_type} - 조정 후 금액이 0 이하 ({new_price:,}원), 건너뜀")
+                continue
+            
+            logger.info(f"  {bill_type}: {original_price:,}원 → {new_price:,}원")
+            
+            new_bill_id = self.payssam._generate_bill_id(app.row_num, f"A{len(plan) + 1}")
+            product_nm = f"{original_item.product_nm} (조정)"
+            payload = {
+                "product_nm": product_nm,
+                "message": self.templates.render("bill", student_name=app.student_name, product_nm=product_nm).text,
+                "member_nm": app.student_name,
+                "phone": app.primary_phone,
+                "price": str(new_price),
+            }
+            plan.append((bill_type, old_bill_id, new_price, new_bill_id, payload))
+        return plan
+    
+    async def _adjust_applicant_bills_async(self, plan: list) -> List[Tuple[BillResult, BillResult]]:
+        """한 학생의 청구서를 순서대로 파기 → 재발송 (시트 기록 없음)"""
+        done = []
+        for _, old_bill_id, _, new_bill_id, payload in plan:
+            # 1. 기존 청구서 파기 - 실패해도 새 청구서는 발송 (기존 것이 이미 결제됐을 수 있음)
+            destroy_result = await self.payssam.destroy_bill_async(old_bill_id)
+            
+            # 2. 새 청구서 발송
+            send_result = await self.payssam.send_bill_async(bill_id=new_bill_id, **payload)
+            done.append((destroy_result, send_result))
+        return done
+    
     def send_adjusted_bills(self, applicants: List[Applicant] = None) -> dict:
-        """가격조정 청구서 재발송 (기존 파기 후 새로 발송)"""
+        return self.runner.run(self.send_adjusted_bills_async(applicants))
+    
+    async def send_adjusted_bills_async(self, applicants: List[Applicant] = None) -> dict:
+        """가격조정 청구서 재발송 (기존 파기 후 새로 발송, 학생별 동시 처리)"""
         if applicants is None:
             applicants = self.get_price_adjustment_applicants()
         
         results = {"success": 0, "fail": 0, "destroy_success": 0, "destroy_fail": 0}
         
+        jobs = []
         for app in applicants:
-            adjustment = app.adjustment_amount
-            if adjustment == 0:
+            if app.adjustment_amount == 0:
                 continue
-            
-            existing_bills = app.get_existing_bill_ids()
-            if not existing_bills:
-                logger.warning(f"[가격조정] {app.student_name} - 기존 청구서 없음, 건너뜀")
+            if any(kind == "adjust" and phone == app.primary_phone for kind, phone, _ in self._held):
+                logger.warning(f"[가격조정] {app.student_name} - 이전 조정 결과 확인 중, 이번 사이클 건너뜀")
                 continue
+            plan = self._plan_adjustment(app)
+            if plan is None:
+                continue
+            if plan:
+                # 복구 때 파기부터 다시 할 수 있도록 기존 청구서 ID도 기록
+                journal_ids = self.journal.begin([
+                    ("adjust", app.row_num, app.primary_phone, bill_type, new_bill_id, dict(payload, old_bill_id=old_bill_id))
+                    for bill_type, old_bill_id, _, new_bill_id, payload in plan
+                ])
+                jobs.append((app, plan, journal_ids))
+            else:
+                # 조정할 수 있는 항목이 없어도 처리 완료로 보고 셀 비움
+                self.clear_price_adjustment(app)
+        
+        if not jobs:
+            return results
+        
+        total = len(jobs)
+        started = time.monotonic()
+        
+        async def adjust(app: Applicant, plan: list, ids: List[int]):
+            return app, plan, ids, await self._adjust_applicant_bills_async(plan)
+        
+        # 끝난 학생부터 기록 (시트 기록은 루프 스레드에서만, 버퍼에 모아 한 번에 반영)
+        for finished, future in enumerate(asyncio.as_completed([adjust(*job) for job in jobs]), 1):
+            app, plan, ids, done = await future
+            logger.info(f"[가격조정] {app.student_name} - {app.adjustment_amount:+,}원")
+            unresolved = False
             
-            logger.info(f"[가격조정] {app.student_name} - 조정금액: {adjustment:+,}원 / {app.primary_phone}")
-            
-            for bill_type, old_bill_id in existing_bills.items():
-                # 원래 가격 찾기
-                original_item = next((item for item in app.get_bill_items() if item.bill_type == bill_type), None)
-                if not original_item:
-                    logger.warning(f"  {bill_type} - 원본 항목 찾을 수 없음")
-                    continue
-                
-                original_price = original_item.price
-                new_price = original_price + adjustment
-                
-                if new_price <= 0:
-                    logger.warning(f"  {bill_type} - 조정 후 금액이 0 이하 ({new_price:,}원), 건너뜀")
-                    continue
-                
-                logger.info(f"  {bill_type}: {original_price:,}원 → {new_price:,}원")
-                
-                # 1. 기존 청구서 파기
-                logger.info(f"    파기 중... (bill_id: {old_bill_id})")
-                destroy_result = self.payssam.destroy_bill(old_bill_id)
-                
+            for (bill_type, old_bill_id, new_price, _, _), entry_id, (destroy_result, send_result) in zip(plan, ids, done):
                 if destroy_result.success:
                     results["destroy_success"] += 1
-                    logger.info(f"    → 파기 성공")
+                    logger.info(f"  {bill_type} 파기 성공 (bill_id: {old_bill_id})")
                 else:
                     results["destroy_fail"] += 1
-                    logger.warning(f"    → 파기 실패: [{destroy_result.code}] {destroy_result.message}")
-                    # 파기 실패해도 새 청구서는 발송 (기존 것이 이미 결제됐을 수 있음)
-                
-                time.sleep(0.3)
-                
-                # 2. 새 청구서 발송
-                new_bill_id = self.payssam._generate_bill_id(app.row_num, "A")  # 20자리 이하로
-                product_nm = f"{original_item.product_nm} (조정)"
-                message = f"안녕하세요. {app.student_name}님의 {product_nm} 안내드립니다. 감사합니다."
-                
-                logger.info(f"    새 청구서 발송 중... ({new_price:,}원)")
-                send_result = self.payssam.send_bill(
-                    bill_id=new_bill_id,
-                    product_nm=product_nm,
-                    message=message,
-                    member_nm=app.student_name,
-                    phone=app.primary_phone,
-                    price=str(new_price)
-                )
+                    logger.warning(f"  {bill_type} 파기 실패 (bill_id: {old_bill_id}): [{destroy_result.code}] {destroy_result.message}")
                 
                 if send_result.success:
                     results["success"] += 1
-                    logger.info(f"    → 발송 성공 (new_bill_id: {send_result.bill_id})")
+                    logger.info(f"  {bill_type} 발송 성공 ({new_price:,}원, new_bill_id: {send_result.bill_id})")
+                    self.journal.mark_sent(entry_id, send_result.bill_id)
                     self.update_bill_record(app, bill_type, send_result.bill_id)
+                    self._journal_unflushed.append(entry_id)
+                elif not send_result.code:
+                    # 응답을 못 받음 → 다음 사이클 복구에서 같은 bill_id로 확인 (그때 셀도 비움)
+                    results["fail"] += 1
+                    logger.warning(f"  {bill_type} 발송 결과 불명, 같은 bill_id로 다시 확인: {send_result.message}")
+                    self.journal.mark_unknown(entry_id)
+                    unresolved = True
                 else:
                     results["fail"] += 1
-                    logger.error(f"    → 발송 실패: [{send_result.code}] {send_result.message}")
-                
-                time.sleep(0.5)
+                    logger.error(f"  {bill_type} 발송 실패: [{send_result.code}] {send_result.message}")
+                    self.journal.mark_failed(entry_id)
             
             # 처리 완료 후 가격조정 셀 비우기
-            self.clear_price_adjustment(app)
-            logger.info(f"  가격조정 셀 초기화 완료")
+            if not unresolved:
+                self.clear_price_adjustment(app)
+            await self._flush_if_full_async()
+            
+            elapsed = time.monotonic() - started
+            eta = elapsed / finished * (total - finished)
+            logger.info(f"  진행 {finished}/{total}명 ({finished * 100 // total}%) · 경과 {elapsed:.0f}초 · 남은 시간 약 {eta:.0f}초")
         
+        logger.info(f"[가격조정] {total}명 처리 - {time.monotonic() - started:.1f}초")
         return results
     
+    def _save_row_state(self, prune: bool = True):
+        """prune: 시트 끝까지 읽었을 때만 마지막 행 이후 상태 삭제"""
+        if self._snapshot is None:
+            return
+        try:
+            for app in self._snapshot:
+                self.row_state.update(app)
+            if prune:
+                self.row_state.prune(self._last_row)
+            self.row_state.save()
+        except Exception as e:
+            logger.error(f"행 상태 저장 실패: {e}")
+    
     def check_and_send(self) -> dict:
-        """신청 확인 + 청구서 발송"""
-        results = {"sms": None, "bill": None}
+        return self.runner.run(self.check_and_send_async())
+    
+    async def check_and_send_async(self) -> dict:
+        """신청 확인 + 청구서 발송 (사이클 지표 기록, 프로파일링 중이면 프로파일 저장)"""
+        metrics = CycleMetrics()
+        profiler = None
+        if self.profiling:
+            # 루프 스레드만 측정 (같은 루프의 다른 시트 사이클도 함께 잡힘)
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            results = await self._run_cycle_async(metrics)
+        finally:
+            if profiler:
+                profiler.disable()
+                self._save_profile(profiler)
+        
+        api = {**self.transport.stats.take(), **self.sheet_stats.take()}
+        log_call_stats(api)
+        queue = {"sheet_writes": len(self.writes), "journal": self.journal.pending_count()}
+        try:
+            self.metrics.export(metrics.finish(results, api, queue, self.governor.snapshot()))
+        except Exception as e:
+            logger.error(f"지표 기록 실패: {e}")
+        return results
+    
+    def _unchanged_since_idle(self, modified_time: str) -> bool:
+        """지난 전체 확인에서 처리할 것이 없었고 그 뒤 시트 수정이 없으면 True (FULL_CHECK_INTERVAL마다는 전체 확인)"""
+        idle = google_cache().idle(self.spreadsheet_id, self.sheet_name)
+        return bool(
+            idle and idle["modified_time"] == modified_time
+            and time.time() - idle["checked_at"] <= FULL_CHECK_INTERVAL
+            and not self.journal.pending_count()
+            and not self._payment_updates
+        )
+    
+    async def _send_all_async(self) -> Tuple[Optional[dict], Optional[dict]]:
+        """신청 문자와 (문자가 이미 나간) 청구서를 동시에 발송, 이번에 문자가 나간 항목은 그 묶음이 끝나는 대로 청구서로 이어감"""
+        new_applicants = self.get_new_applicants()
+        bill_pending = self.get_bill_pending_applicants()
+        
+        bill_tasks = []
+        if bill_pending:
+            total_bills = sum(len(app.get_bill_ready_items()) for app in bill_pending)
+            logger.info(f"📄 청구서 발송 대상 {len(bill_pending)}명 ({total_bills}건)")
+            bill_tasks.append(asyncio.ensure_future(self.send_bills_async(bill_pending)))
         
+        def bill_after_sms(recorded: list):
+            # 문자 묶음 안에서 학생별로 모음 (처음부터 청구서 대상이던 항목은 이미 문자가 있었으므로 겹치지 않음)
+            by_app = {}
+            for app, item in recorded:
+                by_app.setdefault(app.row_num, (app, []))[1].append(item)
+            bill_tasks.append(asyncio.ensure_future(self._send_bill_items_async(list(by_app.values()))))
+        
+        sms_results = None
         try:
-            # 1. 문자 발송
-            new_applicants = self.get_new_applicants()
             if new_applicants:
                 pending_count = sum(len(app.get_pending_sms_items()) for app in new_applicants)
                 logger.info(f"📱 문자 발송 대상 {len(new_applicants)}명 ({pending_count}건)")
-                results["sms"] = self.send_registration_sms(new_applicants)
-            
-            self.sheet = self.spreadsheet.worksheet("수업 신청")
-            
-            # 2. 청구서 발송
-            bill_pending = self.get_bill_pending_applicants()
-            if bill_pending:
-                total_bills = sum(len([i for i in app.get_pending_bill_items() if i.bill_type in app.existing_sms]) for app in bill_pending)
-                logger.info(f"📄 청구서 발송 대상 {len(bill_pending)}명 ({total_bills}건)")
-                results["bill"] = self.send_bills(bill_pending)
+                sms_results = await self.send_registration_sms_async(new_applicants, on_recorded=bill_after_sms)
             
+            bill_results = None
+            if bill_tasks:
+                bill_results = {"success": 0, "fail": 0}
+                for result in await asyncio.gather(*bill_tasks):
+                    bill_results["success"] += result["success"]
+                    bill_results["fail"] += result["fail"]
+            return sms_results, bill_results
+        finally:
+            # 문자 발송이 예외/취소로 끝나도 이미 시작한 청구서 작업을 남겨두지 않음 (취소 후 끝날 때까지 대기)
+            unfinished = [task for task in bill_tasks if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                await asyncio.gather(*unfinished, return_exceptions=True)
+    
+    async def _run_cycle_async(self, metrics: CycleMetrics) -> dict:
+        results = {"sms": None, "bill": None}
+        
+        # 0. 시트 수정 시각만 먼저 확인 (조회 전에 읽어야 조회 중 수정된 것도 다음 사이클에 잡힘)
+        modified_time = None
+        if self.gc:
+            with metrics.stage("change_check"):
+                modified_time = await self.runner.call("sheets", fetch_modified_time, self.spreadsheet_id, session=self.gc.http_client.session,
+                                                       transport=self.transport, limiter=self.governor["sheets"])
+            if modified_time and self._unchanged_since_idle(modified_time):
+                logger.info("시트 변경 없음, 대기 중인 처리 없음 → 건너뜀")
+                await self.runner.call(None, save_google_token)
+                return results
+        
+        idle = False
+        complete = False
+        try:
+            idle = await self._run_chunks_async(metrics, results)
+            complete = True
         except Exception as e:
             logger.error(f"체크 중 오류: {e}")
             import traceback
             traceback.print_exc()
+        finally:
+            with metrics.stage("flush"):
+                await self.runner.call("sheets", self.flush_writes)
+            with metrics.stage("row_state"):
+                await self.runner.call(None, self._save_row_state, complete)
+            self._snapshot = None
+            self._store = None
+            if self.gc:
+                await self.runner.call(None, self._save_google_cache, modified_time if idle else None)
         
         return results
+    
+    async def _run_chunks_async(self, metrics: CycleMetrics, results: dict) -> bool:
+        """시트를 chunk_rows행씩 읽으면서 (다음 구간은 미리 조회) 구간마다 바로 발송, 처리할 것이 남지 않았으면 True
+        
+        메모리에는 처리 중인 구간 + 미리 읽는 구간만 유지 (지난 사이클 이후 변경 없는 완료 행은 발송 판정에서 제외)
+        """
+        rows = self.chunk_rows
+        if self.journal.pending_count():
+            # 미완료 저널 복구는 행이 밀렸으면 전체 행에서 학생을 다시 찾아야 함 → 이번 사이클만 한 번에 전체 조회
+            rows = 0
+        
+        idle = True
+        total = active = 0
+        updates = self._take_payment_updates()
+        chunks = self._stream_chunks_async(rows)
+        try:
+            while True:
+                with metrics.stage("fetch"):
+                    applicants = await anext(chunks, None)
+                if applicants is None:
+                    break
+                if not rows:
+                    with metrics.stage("replay"):
+                        await self._replay_journal_async(applicants)
+                with metrics.stage("payment"):
+                    self._apply_payment_updates(applicants, updates)
+                with metrics.stage("filter"):
+                    self._snapshot = [app for app in applicants if not self.row_state.is_unchanged(app)]
+                    self._store = None
+                total += len(applicants)
+                active += len(self._snapshot)
+                
+                # 문자 + 청구서 발송 (백엔드별 동시 요청 수 안에서 겹쳐서 진행)
+                with metrics.stage("send"):
+                    sent = await self._send_all_async()
+                for kind, counts in zip(("sms", "bill"), sent):
+                    if counts:
+                        merged = results[kind] or {"success": 0, "fail": 0}
+                        results[kind] = {key: merged[key] + counts[key] for key in merged}
+                
+                # 실패 등으로 남은 발송이 없으면 '처리할 것 없음' → 시트가 수정될 때까지 다음 사이클 생략 가능
+                idle = self._applicant_store().idle() and idle
+                with metrics.stage("row_state"):
+                    for app in self._snapshot:
+                        self.row_state.update(app)
+                self._snapshot = []
+        except BaseException:
+            self._requeue_payment_updates(updates)
+            raise
+        finally:
+            await chunks.aclose()
+        
+        self._drop_payment_updates(updates)
+        metrics.rows = {"total": total, "active": active}
+        logger.info(f"변경/미완료 행 {active}개 / 전체 {total}개")
+        return idle
+    
+    def _save_google_cache(self, idle_modified_time: Optional[str]):
+        try:
+            if idle_modified_time and (self.writes or self.journal.pending_count()):
+                idle_modified_time = None
+            google_cache().set_idle(self.spreadsheet_id, self.sheet_name, idle_modified_time)
+            save_google_token()
+            google_cache().save()
+        except Exception as e:
+            logger.error(f"구글 캐시 저장 실패: {e}")
+    
+    def toggle_profiling(self) -> bool:
+        """프로파일링 켜기/끄기 (다음 사이클부터 적용)"""
+        self.profiling = not self.profiling
+        logger.info(f"[프로파일] {'켜짐' if self.profiling else '꺼짐'}")
+        return self.profiling
+    
+    def _save_profile(self, profiler: cProfile.Profile):
+        """사이클 프로파일 저장 (snakeviz 등으로 열람) + 누적 시간 상위 함수 로그"""
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"cycle_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof")
+            profiler.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+            logger.info(f"[프로파일] {path}\n{out.getvalue()}")
+        except Exception as e:
+            logger.error(f"프로파일 저장 실패: {e}")
+
+
+####---------- 여러 시트 동시 처리 ----------####
+
+def load_targets(path: str = TARGETS_PATH) -> List[dict]:
+    """대상 목록 로드 - [{"name": "2027_겨울", "sheet_id": "...", "worksheet": "수업 신청"}, ...]
+    
+    name 생략 시 시트 ID 앞 8자리 + 워크시트 이름
+    """
+    with open(path, encoding="utf-8") as f:
+        targets = json.load(f)
+    
+    names = set()
+    for target in targets:
+        target.setdefault("worksheet", "수업 신청")
+        target["name"] = target.get("name") or f"{target['sheet_id'][:8]}_{target['worksheet']}"
+        if target["name"] in names:
+            raise ValueError(f"대상 이름 중복: {target['name']}")
+        names.add(target["name"])
+    return targets
+
+
+def make_target_checker(target: dict, state_dir: str = STATE_DIR) -> "ApplyChecker":
+    """대상별 ApplyChecker - 구글 인증/HTTP 연결은 공용, 행 상태/저널/속도 제한/지표는 대상별"""
+    dir_name = re.sub(r"[^\w.-]", "_", target["name"])
+    target_dir = os.path.join(state_dir, dir_name)
+    os.makedirs(target_dir, exist_ok=True)
+    
+    prom_path = ""
+    if METRICS_PROM_PATH:
+        prom_path = os.path.join(os.path.dirname(METRICS_PROM_PATH), f"{dir_name}_{os.path.basename(METRICS_PROM_PATH)}")
+    return ApplyChecker(
+        sheet_id=target["sheet_id"],
+        sheet_name=target["worksheet"],
+        name=target["name"],
+        row_state_path=os.path.join(target_dir, "row_state.json"),
+        journal_path=os.path.join(target_dir, "outbox.db"),
+        governor=RateGovernor(),
+        metrics_path=os.path.join(target_dir, "metrics.jsonl") if METRICS_PATH else "",
+        metrics_prom_path=prom_path,
+    )
+
+
+class TargetScheduler:
+    """여러 대상을 번갈아 처리 - 대상마다 1사이클씩 도착 순서대로(FIFO), 최대 workers개 동시
+    
+    - 한 대상은 동시에 한 사이클만 실행 (행 상태/저널/시트 기록 충돌 방지)
+    - 사이클이 끝난 대상은 interval초 뒤 줄 맨 끝으로 → 느리거나 대상자가 많은 시트가 다른 시트를 굶기지 않음
+    """
+    
+    def __init__(self, checkers: List["ApplyChecker"], interval: float = 30, workers: int = TARGET_WORKERS):
+        self.checkers = checkers
+        self.interval = interval
+        self.workers = max(1, min(workers, len(checkers)))
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+    
+    def _run_cycle(self, checker: "ApplyChecker"):
+        logger.info(f"[{checker.name}] 시트 확인 중...")
+        try:
+            checker.check_and_send()
+        except Exception as e:
+            logger.error(f"[{checker.name}] 오류 발생: {e}")
+    
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                due, checker = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            wait = due - time.monotonic()
+            if wait > 0 and self._stop.wait(wait):
+                break
+            self._run_cycle(checker)
+            self._queue.put((time.monotonic() + self.interval, checker))
+    
+    def run_forever(self):
+        for checker in self.checkers:
+            self._queue.put((time.monotonic(), checker))
+        threads = [threading.Thread(target=self._worker, name=f"target-{i}", daemon=True) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(0.5)
+        finally:
+            # 진행 중인 사이클은 끝까지 (발송 후 시트 기록 보장)
+            self.stop()
+            for thread in threads:
+                thread.join()
+    
+    def stop(self):
+        self._stop.set()
+
+
+####---------- 웹훅 트리거 ----------####
+
+class TriggerServer:
+    """폼 제출/Apps Script 웹훅(POST /trigger) 수신 → check_and_send 즉시 실행
+    
+    - debounce초 안에 몰려온 요청은 1사이클로 합침
+    - 요청이 없으면 폴링, 처리할 게 없을수록 간격을 늘림 (min_interval → max_interval)
+    - GET /metrics: Prometheus 지표, POST /profile: 프로파일링 켜기/끄기
+    - POST /payssam/callback: 결제선생 결제 결과 통보 (hash 확인 후 다음 사이클에 결제 상태 기록)
+    """
+    
+    def __init__(self, checker: "ApplyChecker", host: str = SERVE_HOST, port: int = SERVE_PORT, token: str = TRIGGER_TOKEN,
+                 debounce: float = 2.0, min_interval: float = 30, max_interval: float = 600):
+        self.checker = checker
+        self.host = host
+        self.port = port
+        self.token = token
+        self.debounce = debounce
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._event = threading.Event()
+        self._httpd = None
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                parts = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode() if length else ""
+                
+                if parts.path not in ("/trigger", "/profile", "/payssam/callback"):
+                    return self._reply(404, {"ok": False, "message": "not found"})
+                if not self._authorized(parts):
+                    return self._reply(403, {"ok": False, "message": "invalid token"})
+                
+                if parts.path == "/profile":
+                    return self._reply(200, {"ok": True, "profiling": server.checker.toggle_profiling()})
+                if parts.path == "/payssam/callback":
+                    return self._payment_callback(body)
+                server.trigger()
+                self._reply(202, {"ok": True, "queued": True})
+            
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path != "/metrics":
+                    return self._reply(404, {"ok": False, "message": "not found"})
+                if not self._authorized(parts):
+                    return self._reply(403, {"ok": False, "message": "invalid token"})
+                
+                data = server.checker.metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def _payment_callback(self, body: str):
+                try:
+                    if self.headers.get("Content-Type", "").startswith("application/json"):
+                        params = json.loads(body or "{}")
+                    else:
+                        params = {k: v[0] for k, v in parse_qs(body).items()}
+                except ValueError:
+                    return self._reply(400, {"code": "9999", "msg": "invalid body"})
+                
+                bill_id = str(params.get("bill_id", ""))
+                price = str(params.get("price") or params.get("appr_price") or "")
+                if not bill_id or not server.checker.payssam.verify_callback(bill_id, str(params.get("phone", "")), price, params.get("hash")):
+                    logger.warning(f"[결제] 통보 hash 불일치 - 무시 ({bill_id or '-'})")
+                    return self._reply(403, {"code": "9999", "msg": "invalid hash"})
+                
+                status = payment_state_label(str(params.get("appr_state", "")))
+                logger.info(f"[결제] 통보 수신 {bill_id} → {status}")
+                server.checker.queue_payment_status(bill_id, status)
+                server.trigger()  # debounce 동안 온 통보는 한 사이클에서 한 번에 기록
+                self._reply(200, {"code": "0000", "msg": "성공"})
+            
+            def _authorized(self, parts) -> bool:
+                token = self.headers.get("X-Trigger-Token") or parse_qs(parts.query).get("token", [""])[0]
+                return not server.token or token == server.token
+            
+            def _reply(self, code: int, body: dict):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, format, *args):
+                logger.debug(f"[웹훅] {self.address_string()} {format % args}")
+        
+        return Handler
+    
+    def trigger(self):
+        self._event.set()
+    
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        logger.info(f"웹훅 대기: http://{self.host}:{self.port}/trigger")
+    
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+    
+    def run_forever(self):
+        interval = self.min_interval
+        while True:
+            triggered = self._event.wait(interval)
+            if triggered:
+                time.sleep(self.debounce)  # 연달아 들어오는 제출은 한 번에 처리
+            self._event.clear()
+            
+            logger.info(f"[{datetime.now().strftime('%H:%M:%S')}] 시트 확인 중... ({'웹훅' if triggered else f'폴링 {interval:.0f}초'})")
+            try:
+                results = self.checker.check_and_send()
+            except Exception as e:
+                logger.error(f"오류 발생: {e}")
+                results = {}
+            
+            if triggered or any(results.values()):
+                interval = self.min_interval
+            else:
+                interval = min(interval * 2, self.max_interval)
 
 
 def 자동실행(check_interval: int = 30):
     checker = ApplyChecker()
     
+    # SIGTERM(서비스 중지, Actions 취소)도 종료 처리 → 대기 중인 시트 기록 반영
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # kill -USR1 <pid>: 프로파일링 켜기/끄기
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: checker.toggle_profiling())
+    
     logger.info("=" * 50)
     logger.info("🚀 신청 확인 시스템 시작")
     logger.info(f"   체크 주기: {check_interval}초")
     logger.info("   종료: Ctrl+C")
     logger.info("=" * 50)
     
-    checker._send_sms(checker.sender, "[박교준 수리논술] 신청 확인 시스템이 시작되었습니다.")
+    checker._send_sms(checker.sender, checker.templates.render("startup", mode=""))
     
     while True:
         try:
@@ -640,9 +3062,9 @@ def 자동실행(check_interval: int = 30):
                 logger.info("대기 중인 처리 없음")
             
             time.sleep(check_interval)
-            checker.sheet = checker.spreadsheet.worksheet("수업 신청")
             
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, SystemExit):
+            checker.flush_writes()
             logger.info("\n신청 확인 시스템 종료")
             break
         except Exception as e:
@@ -650,6 +3072,76 @@ def 자동실행(check_interval: int = 30):
             time.sleep(check_interval)
 
 
+def 웹훅실행(port: int = SERVE_PORT):
+    """웹훅 수신 모드 (요청 즉시 처리 + 변경 없을 때 점점 느려지는 폴링)"""
+    checker = ApplyChecker()
+    server = TriggerServer(checker, port=port)
+    
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: checker.toggle_profiling())
+    
+    logger.info("=" * 50)
+    logger.info("🚀 신청 확인 시스템 시작 (웹훅 모드)")
+    logger.info(f"   폴링 주기: {server.min_interval:.0f}~{server.max_interval:.0f}초")
+    logger.info("   종료: Ctrl+C")
+    logger.info("=" * 50)
+    
+    server.start()
+    checker._send_sms(checker.sender, checker.templates.render("startup", mode=" (웹훅 모드)"))
+    server.trigger()  # 시작하자마자 1회 확인
+    
+    try:
+        server.run_forever()
+    except (KeyboardInterrupt, SystemExit):
+        checker.flush_writes()
+        logger.info("\n신청 확인 시스템 종료")
+    finally:
+        server.stop()
+
+
+def 다중실행(targets_path: str = TARGETS_PATH, check_interval: int = 30):
+    """여러 시트(시즌/반별)를 한 프로세스에서 처리 - 구글 인증 1회, HTTP 연결 공용"""
+    targets = load_targets(targets_path)
+    checkers = [make_target_checker(target) for target in targets]
+    scheduler = TargetScheduler(checkers, interval=check_interval)
+    
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: [checker.toggle_profiling() for checker in checkers])
+    
+    logger.info("=" * 50)
+    logger.info("🚀 신청 확인 시스템 시작 (여러 시트)")
+    for target in targets:
+        logger.info(f"   - {target['name']}: {target['sheet_id']} / {target['worksheet']}")
+    logger.info(f"   체크 주기: {check_interval}초, 동시 처리: {scheduler.workers}개")
+    logger.info("   종료: Ctrl+C")
+    logger.info("=" * 50)
+    
+    checkers[0]._send_sms(checkers[0].sender, checkers[0].templates.render("startup", mode=f" (시트 {len(checkers)}개)"))
+    
+    try:
+        scheduler.run_forever()
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("\n신청 확인 시스템 종료")
+    finally:
+        for checker in checkers:
+            checker.flush_writes()
+
+
+def 결제상태동기화():
+    """결제 통보를 놓친 청구서의 결제 상태를 결제선생에서 조회해 시트에 기록 (수동/주기 실행)"""
+    checker = ApplyChecker()
+    
+    logger.info("=" * 50)
+    logger.info("💳 결제 상태 동기화")
+    logger.info("=" * 50)
+    
+    results = checker.sync_payment_status()
+    checker.flush_writes()
+    logger.info(f"완료 - 조회 {results['checked']}건, 갱신 {results['updated']}건, 실패 {results['fail']}건")
+
+
 def 가격조정실행():
     """가격조정 청구서 재발송 (수동 실행)"""
     checker = ApplyChecker()
@@ -658,9 +3150,13 @@ def 가격조정실행():
     logger.info("💰 가격조정 청구서 재발송")
     logger.info("=" * 50)
     
+    # 지난 실행에서 발송 후 시트에 반영되지 못한 조정 건부터 복구 (중복 재발송 방지)
+    checker._snapshot = checker._fetch_applicants()
+    checker._replay_journal(checker._snapshot)
     applicants = checker.get_price_adjustment_applicants()
     
     if not applicants:
+        checker.flush_writes()
         logger.info("가격조정 대상자가 없습니다.")
         return
     
@@ -670,10 +3166,12 @@ def 가격조정실행():
     
     confirm = input("\n진행하시겠습니까? (y/n): ")
     if confirm.lower() != 'y':
+        checker.flush_writes()
         logger.info("취소됨")
         return
     
     results = checker.send_adjusted_bills(applicants)
+    checker.flush_writes()
     
     logger.info("=" * 50)
     logger.info(f"처리 완료")
@@ -683,14 +3181,28 @@ def 가격조정실행():
 
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) > 1:
         if sys.argv[1] == "auto":
             자동실행(check_interval=30)
+        elif sys.argv[1] == "serve":
+            웹훅실행(port=int(sys.argv[2]) if len(sys.argv) > 2 else SERVE_PORT)
+        elif sys.argv[1] == "simulate":
+            from simulate import 시뮬레이션실행  # 가짜 시트/서버는 별도 모듈
+            시뮬레이션실행(
+                source=sys.argv[2] if len(sys.argv) > 2 else "1000",
+                cycles=int(sys.argv[3]) if len(sys.argv) > 3 else 3,
+            )
+        elif sys.argv[1] == "multi":
+            다중실행(targets_path=sys.argv[2] if len(sys.argv) > 2 else TARGETS_PATH)
         elif sys.argv[1] == "adjust":
             가격조정실행()
+        elif sys.argv[1] == "sync":
+            결제상태동기화()
         elif sys.argv[1] == "once":
+            # 지난 실행 이후 시트 수정이 없고 처리할 것도 없으면 구글 시트 인증 없이 바로 종료
+            if 빠른확인():
+                logger.info("시트 변경 없음, 대기 중인 처리 없음 → 종료")
+                sys.exit(0)
             checker = ApplyChecker()
             logger.info("=" * 50)
             logger.info("📱 신청 확인 (1회 실행)")
@@ -707,4 +3219,8 @@ if __name__ == "__main__":
         print("=" * 50)
         print("python apply_checker.py auto     # 자동 실행 (30초 주기)")
         print("python apply_checker.py once     # 1회 실행")
+        print("python apply_checker.py serve    # 웹훅 수신 모드 (POST /trigger 즉시 실행)")
+        print("python apply_checker.py multi [targets.json]  # 여러 시트 동시 실행 (대상별 상태는 state/)")
         print("python apply_checker.py adjust   # 가격조정 청구서 재발송")
+        print("python apply_checker.py sync     # 결제 상태 동기화 (놓친 결제 통보 보정)")
+        print("python apply_checker.py simulate [행수|CSV/XLSX] [사이클수]  # 오프라인 리허설 (실제 발송 없음)")
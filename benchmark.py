@@ -0,0 +1,164 @@
+"""
+신청 확인 시스템 - 벤치마크
+가짜 시트(1천~10만 행) + 가짜 알리고/결제선생 서버로 check_and_send 단계별 처리 시간, 최대 메모리, 사이클당 API 호출 수 측정
+
+python benchmark.py                        # 1000, 10000, 100000행
+python benchmark.py 5000 20000 --json out.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+import apply_checker as ac
+import simulate as sim
+
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def _peak_memory(func) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _mark_processed(checker, applicants):
+    """발송 단계를 건너뛴 크기에서는 발송된 것으로 기록 (변경 없는 사이클 측정용)"""
+    for app in applicants:
+        for item in app.get_pending_sms_items():
+            checker.append_sms_record(app, item.bill_type)
+        for item in app.get_bill_ready_items():
+            checker.append_bill_record(app, item.bill_type, "BENCH")
+    checker.flush_writes()
+
+
+def run_size(rows: int, selections: int, send_max: int, measure_memory: bool, seed: int = 0) -> dict:
+    work_dir = tempfile.mkdtemp(prefix="apply_bench_")
+    sheet_path = os.path.join(work_dir, "sheet.csv")
+    sim.LocalSheet.create(sheet_path, sim.generate_sample_rows(rows, seed=seed, max_per_course=selections))
+
+    server = sim.FakeBackendServer(latency=0, error_rate=0, seed=seed).start()
+    sheet = sim.LocalSheet(sheet_path)
+    checker = ac.ApplyChecker(
+        sheet=sheet,
+        row_state_path=os.path.join(work_dir, "row_state.json"),
+        journal_path=os.path.join(work_dir, "outbox.db"),
+        aligo_url=server.url,
+        payssam_url=server.url,
+        # 속도 제한 없이 순수 처리량 측정
+        governor=ac.RateGovernor({backend: (1e9, 1e9, None) for backend in ac.RateGovernor.DEFAULT_LIMITS}),
+    )
+    checker.metrics = ac.MetricsExporter(jsonl_path=os.path.join(work_dir, "metrics.jsonl"))
+    # 운영용 bill_seq.json을 건드리지 않도록 작업 폴더의 카운터 사용
+    checker.payssam.bill_ids = ac.BillIdAllocator(os.path.join(work_dir, "bill_seq.json"))
+    ac.CATALOG = ac.CourseCatalog()
+
+    stages = {}
+    try:
+        sheet.take_calls()
+        applicants, stages["fetch"] = _timed(checker._fetch_applicants)
+        _, stages["parse"] = _timed(lambda: [app.get_bill_items() for app in applicants])
+
+        checker._snapshot = applicants
+        # 판정 집합(문자/청구서/조정 대상)은 한 번에 만들어짐 → 따로 재야 filter_* 가 각자의 선택 비용만 나타냄
+        checker._store = None
+        _, stages["store"] = _timed(checker._applicant_store)
+        new_applicants, stages["filter_sms"] = _timed(checker.get_new_applicants)
+        bill_pending, stages["filter_bill"] = _timed(checker.get_bill_pending_applicants)
+        _, stages["filter_adjust"] = _timed(checker.get_price_adjustment_applicants)
+        items = sum(len(app.get_bill_items()) for app in applicants)
+
+        sent = {"sms": 0, "bill": 0}
+        if rows <= send_max:
+            sms_results, stages["send_sms"] = _timed(lambda: checker.send_registration_sms(new_applicants))
+            bill_results, stages["send_bills"] = _timed(lambda: checker.send_bills(checker.get_bill_pending_applicants()))
+            _, stages["flush"] = _timed(checker.flush_writes)
+            sent = {"sms": sms_results["success"], "bill": bill_results["success"]}
+        else:
+            _mark_processed(checker, applicants)
+        checker._snapshot = None
+        first_calls = {"api": sum(server.take_calls().values()), **sheet.take_calls()}
+
+        # 변경 없는 상태의 사이클 (행 상태 저장 후 두 번째 사이클)
+        checker.check_and_send()
+        server.take_calls()
+        sheet.take_calls()
+        _, stages["idle_cycle"] = _timed(checker.check_and_send)
+        idle_calls = {"api": sum(server.take_calls().values()), **sheet.take_calls()}
+
+        peak = 0
+        if measure_memory:
+            ac.CATALOG = ac.CourseCatalog()
+            def load_and_filter():
+                checker._snapshot = checker._fetch_applicants()
+                checker.get_new_applicants()
+                checker.get_bill_pending_applicants()
+                checker._snapshot = None
+            peak = _peak_memory(load_and_filter)
+    finally:
+        server.stop()
+
+    return {
+        "rows": rows,
+        "applicants": len(applicants),
+        "items": items,
+        "sent": sent,
+        "stages": stages,
+        "rows_per_sec": {name: rows / seconds for name, seconds in stages.items() if seconds > 0},
+        "peak_memory_mb": peak / 1024 / 1024,
+        "calls_first_cycle": first_calls,
+        "calls_idle_cycle": idle_calls,
+    }
+
+
+def print_report(result: dict):
+    print(f"\n■ {result['rows']:,}행 (지원자 {result['applicants']:,}명, 신청 항목 {result['items']:,}건)")
+    for name, seconds in result["stages"].items():
+        rate = result["rows_per_sec"].get(name, 0)
+        print(f"  {name:<14} {seconds * 1000:10.1f} ms  {rate:12,.0f} 행/초")
+    if result["sent"]["sms"] or result["sent"]["bill"]:
+        print(f"  발송: 문자 {result['sent']['sms']:,}건 / 청구서 {result['sent']['bill']:,}건")
+    if result["peak_memory_mb"]:
+        print(f"  최대 메모리 (조회+필터): {result['peak_memory_mb']:.1f} MB")
+    first, idle = result["calls_first_cycle"], result["calls_idle_cycle"]
+    print(f"  API 호출: 첫 사이클 {first['api']:,}회 (시트 읽기 {first['read']} / 쓰기 {first['write']}), "
+          f"변경 없는 사이클 {idle['api']:,}회 (시트 읽기 {idle['read']} / 쓰기 {idle['write']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="신청 확인 시스템 벤치마크")
+    parser.add_argument("rows", nargs="*", type=int, default=[1000, 10000, 100000], help="시트 행 수")
+    parser.add_argument("--selections", type=int, default=2, help="과정별 최대 선택 수")
+    parser.add_argument("--send-max", type=int, default=10000, help="이 행 수 이하일 때만 발송 단계 측정")
+    parser.add_argument("--no-memory", action="store_true", help="메모리 측정 생략")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장 (회귀 비교용)")
+    args = parser.parse_args()
+
+    # 학생별 로그는 측정에서 제외
+    ac.logger.setLevel(logging.WARNING)
+
+    results = []
+    for rows in args.rows:
+        result = run_size(rows, args.selections, args.send_max, not args.no_memory)
+        print_report(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+신청 확인 시스템 - 시뮬레이션 (오프라인 리허설)
+로컬 시트(CSV/XLSX) + 가짜 알리고/결제선생 서버로 실제 발송 없이 check_and_send 실행
+
+python simulate.py [행수|CSV/XLSX] [사이클수]
+(python apply_checker.py simulate ... 와 같음, benchmark.py와 테스트도 여기 가짜 시트/서버를 사용)
+"""
+
+from typing import List
+from urllib.parse import urlsplit, parse_qs
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import time
+import os
+import sys
+import json
+import csv
+import random
+import shutil
+import tempfile
+import threading
+
+from apply_checker import ApplyChecker, BillIdAllocator, MetricsExporter, a1_to_rowcol, logger
+
+SIM_LATENCY = float(os.environ.get("SIM_LATENCY", "0.05"))      # 시뮬레이션 가짜 API 응답 지연(초)
+SIM_ERROR_RATE = float(os.environ.get("SIM_ERROR_RATE", "0.01"))  # 시뮬레이션 가짜 API 실패 확률
+SIM_QUOTA = float(os.environ.get("SIM_QUOTA", "0"))              # 시뮬레이션 가짜 API 초당 할당량 (초과 시 429, 0이면 무제한)
+
+
+####---------- 로컬 시트 / 가짜 API 서버 ----------####
+
+class LocalSheet:
+    """CSV/XLSX 파일을 gspread 워크시트처럼 쓰는 로컬 시트 (기록할 때마다 파일에 저장)"""
+    
+    def __init__(self, path: str, title: str = "수업 신청"):
+        self.path = path
+        self.title = title
+        self.calls = {"read": 0, "write": 0}
+        self._lock = threading.Lock()
+        self._rows = self._load()
+    
+    @property
+    def _is_xlsx(self) -> bool:
+        return self.path.lower().endswith(".xlsx")
+    
+    def _load(self) -> List[List[str]]:
+        if self._is_xlsx:
+            try:
+                import openpyxl
+            except ImportError:
+                raise RuntimeError("XLSX 시트를 쓰려면 openpyxl 설치 필요 (pip install openpyxl)")
+            workbook = openpyxl.load_workbook(self.path, read_only=True)
+            worksheet = workbook[self.title] if self.title in workbook.sheetnames else workbook.active
+            rows = [["" if v is None else str(v) for v in row] for row in worksheet.iter_rows(values_only=True)]
+            workbook.close()
+            return rows
+        with open(self.path, encoding="utf-8-sig", newline="") as f:
+            return [row for row in csv.reader(f)]
+    
+    def _save(self):
+        if self._is_xlsx:
+            import openpyxl
+            workbook = openpyxl.Workbook()
+            worksheet = workbook.active
+            worksheet.title = self.title
+            for row in self._rows:
+                worksheet.append(row)
+            workbook.save(self.path)
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
+            csv.writer(f).writerows(self._rows)
+        os.replace(tmp_path, self.path)
+    
+    @classmethod
+    def create(cls, path: str, rows: List[List[str]], title: str = "수업 신청") -> "LocalSheet":
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            csv.writer(f).writerows(rows)
+        return cls(path, title)
+    
+    def take_calls(self) -> dict:
+        with self._lock:
+            calls, self.calls = self.calls, {"read": 0, "write": 0}
+        return calls
+    
+    @property
+    def row_count(self) -> int:
+        """그리드 행 수 (gspread 워크시트와 같은 속성, 빈 행 포함)"""
+        return len(self._rows)
+    
+    def row_values(self, row: int) -> List[str]:
+        with self._lock:
+            self.calls["read"] += 1
+            return list(self._rows[row - 1]) if row <= len(self._rows) else []
+    
+    def get_values(self, range_name: str = None, **kwargs) -> List[List[str]]:
+        """range_name: 생략 시 전체, "시작행:끝행" 행 범위 지원 (구글 시트처럼 끝의 빈 행은 제외)"""
+        with self._lock:
+            self.calls["read"] += 1
+            rows = self._rows
+            if range_name:
+                first, last = range_name.split("!")[-1].split(":")
+                rows = rows[int(first) - 1:int(last)]
+                while rows and not any(str(v).strip() for v in rows[-1]):
+                    rows = rows[:-1]
+            width = max((len(row) for row in rows), default=0)
+            return [list(row) + [""] * (width - len(row)) for row in rows]
+    
+    def _set(self, row: int, col: int, value: str):
+        while len(self._rows) < row:
+            self._rows.append([])
+        cells = self._rows[row - 1]
+        if len(cells) < col:
+            cells.extend([""] * (col - len(cells)))
+        cells[col - 1] = str(value)
+    
+    def batch_update(self, data: list, **kwargs):
+        with self._lock:
+            self.calls["write"] += 1
+            for update in data:
+                row, col = a1_to_rowcol(update["range"].split("!")[-1])
+                for r, values in enumerate(update["values"]):
+                    for c, value in enumerate(values):
+                        self._set(row + r, col + c, value)
+            self._save()
+    
+    def update_cell(self, row: int, col: int, value: str):
+        with self._lock:
+            self.calls["write"] += 1
+            self._set(row, col, value)
+            self._save()
+
+
+class FakeBackendServer:
+    """알리고(/send/, /send_mass/, /list/, /sms_list/) + 결제선생(/if/bill/send, /if/bill/destroy, /if/bill/read) 흉내 내는 로컬 HTTP 서버
+    
+    latency: 응답 지연(초), error_rate: 건별 실패 확률
+    quota: 백엔드(알리고/결제선생)별 초당 허용 요청 수, 넘으면 429 + Retry-After (0이면 무제한)
+    reject: 이 경로 요청은 처리하지 않고 오류 코드로 거절
+    stall: 경로 -> 초, 요청을 처리한 뒤 응답만 늦춤 (응답 타임아웃 흉내)
+    """
+    
+    def __init__(self, latency: float = SIM_LATENCY, error_rate: float = SIM_ERROR_RATE, seed: int = None,
+                 quota: float = SIM_QUOTA):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota = quota
+        self._windows = {}  # 백엔드 -> (초, 요청 수)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bills = set()
+        self._deliveries = {}  # msg_id -> {수신번호: 실패 여부}
+        self._sent_at = {}     # msg_id -> 등록 시각
+        self._next_msg_id = 1
+        self.calls = {}
+        self.reject = set()
+        self.duplicate_code = "9001"  # 같은 bill_id 재발송 거절 코드 (클라이언트는 이 값에 기대지 않고 /if/bill/read로 확인)
+        self.stall = {}
+        self._httpd = None
+    
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+    
+    def _fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+    
+    def _over_quota(self, path: str) -> bool:
+        if not self.quota:
+            return False
+        backend = "payssam" if path.startswith("/if/") else "aligo"
+        second = int(time.monotonic())
+        with self._lock:
+            window, count = self._windows.get(backend, (second, 0))
+            count = count + 1 if window == second else 1
+            self._windows[backend] = (second, count)
+            if count > self.quota:
+                self.calls["429"] = self.calls.get("429", 0) + 1
+                return True
+        return False
+    
+    def _msg_id(self, deliveries: dict) -> int:
+        with self._lock:
+            msg_id, self._next_msg_id = self._next_msg_id, self._next_msg_id + 1
+            self._deliveries[msg_id] = deliveries
+            self._sent_at[msg_id] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return msg_id
+    
+    def handle(self, path: str, params: dict) -> dict:
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        if path in self.reject:
+            return {"result_code": "-101", "code": "9999", "message": "시뮬레이션 거절", "msg": "시뮬레이션 거절"}
+        
+        if path == "/send/":
+            if self._fail():
+                return {"result_code": "-101", "message": "시뮬레이션 발송 실패"}
+            msg_id = self._msg_id({params.get("receiver", ""): False})
+            return {"result_code": "1", "message": "success", "msg_id": msg_id, "success_cnt": 1, "error_cnt": 0}
+        
+        if path == "/send_mass/":
+            cnt = int(params.get("cnt", 0))
+            deliveries = {params.get(f"rec_{i}", ""): self._fail() for i in range(1, cnt + 1)}
+            failed = sum(deliveries.values())
+            return {"result_code": "1", "message": "success", "msg_id": self._msg_id(deliveries),
+                    "success_cnt": cnt - failed, "error_cnt": failed, "msg_type": params.get("msg_type", "SMS")}
+        
+        if path == "/list/":
+            with self._lock:
+                sent = sorted(self._sent_at.items(), reverse=True)
+            return {"result_code": "1", "message": "success", "next_yn": "N",
+                    "list": [{"mid": str(msg_id), "reg_date": reg_date} for msg_id, reg_date in sent]}
+        
+        if path == "/sms_list/":
+            with self._lock:
+                deliveries = dict(self._deliveries.get(int(params.get("mid", 0)), {}))
+            return {"result_code": "1", "message": "success", "next_yn": "N",
+                    "list": [{"receiver": phone, "sms_state": "전송실패" if failed else "발송완료"}
+                             for phone, failed in deliveries.items()]}
+        
+        bill_id = params.get("bill", {}).get("bill_id", "")
+        if path == "/if/bill/send":
+            with self._lock:
+                duplicate = bill_id in self._bills
+            if duplicate:
+                return {"code": self.duplicate_code, "msg": "이미 등록된 청구서"}
+            if self._fail():
+                return {"code": "9999", "msg": "시뮬레이션 발송 실패"}
+            with self._lock:
+                self._bills.add(bill_id)
+            return {"code": "0000", "msg": "성공", "bill_id": bill_id, "shortURL": f"https://payssam.kr/sim/{bill_id}"}
+        
+        if path == "/if/bill/destroy":
+            with self._lock:
+                exists = bill_id in self._bills
+                if exists and not self._random.random() < self.error_rate:
+                    self._bills.discard(bill_id)
+                    return {"code": "0000", "msg": "파기 성공"}
+            return {"code": "9999", "msg": "시뮬레이션 파기 실패" if exists else "없는 청구서"}
+        
+        if path == "/if/bill/read":
+            with self._lock:
+                exists = bill_id in self._bills
+                state = self._random.choice("FW")
+            if not exists:
+                return {"code": "9999", "msg": "없는 청구서"}
+            return {"code": "0000", "msg": "조회 성공", "bill": {"bill_id": bill_id, "appr_state": state}}
+        
+        return {"result_code": "-999", "code": "9999", "message": "unknown path", "msg": "unknown path"}
+    
+    def start(self) -> "FakeBackendServer":
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    params = json.loads(body or "{}")
+                else:
+                    params = {k: v[0] for k, v in parse_qs(body).items()}
+                path = urlsplit(self.path).path
+                if server._over_quota(path):
+                    self.send_response(429)
+                    self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                data = json.dumps(server.handle(path, params), ensure_ascii=False).encode()
+                if server.stall.get(path):
+                    time.sleep(server.stall[path])
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+    
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+    
+    def take_calls(self) -> dict:
+        with self._lock:
+            calls, self.calls = self.calls, {}
+        return calls
+
+
+####---------- 가짜 신청 시트 / 리허설 실행 ----------####
+
+_SIM_SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+_SIM_GIVEN = ["민준", "서윤", "도윤", "서연", "하준", "지우", "시우", "하윤", "주원", "지민", "예준", "채원", "유준", "수아", "건우"]
+_SIM_OPTIONS = {
+    "surinonseul_regular": [
+        "수리논술 정규 A반 (온라인)ㅣ3월 2일 개강",
+        "수리논술 정규 B반 (현강)ᅵ3월 4일 개강",
+        "수리논술 정규 C반 (현강)ㅣ토요일ㅣ3월 7일 개강",
+        "[마감] 수리논술 정규 D반 (현강)ㅣ3월 1일 개강",
+    ],
+    "surinonseul_trial": [
+        "수리논술 체험 1회 (현강)ㅣ2월 25일",
+        "수리논술 체험 1회 (온라인)ᅵ2월 26일",
+        "[마감] 수리논술 체험 특강ㅣ2월 20일",
+    ],
+    "suneung_regular": [
+        "수능 수학 정규반 (온라인)ㅣ3월 3일 개강",
+        "수능 수학 심화반 (현강)ᅵ3월 5일 개강",
+        "마감 - 수능 수학 주말반",
+    ],
+}
+
+
+def generate_sample_rows(count: int, seed: int = 0, max_per_course: int = 2) -> List[List[str]]:
+    """시뮬레이션/벤치마크용 가짜 신청 시트 (헤더 포함)"""
+    rng = random.Random(seed)
+    header = list(ApplyChecker.COLUMNS.values())
+    rows = [header]
+    for i in range(count):
+        row = dict.fromkeys(ApplyChecker.COLUMNS, "")
+        row["timestamp"] = (datetime(2026, 2, 1) + timedelta(seconds=i * 37)).strftime("%Y. %m. %d %p %I:%M:%S")
+        row["user_type"] = rng.choice(["학부모", "학생"])
+        row["student_name"] = rng.choice(_SIM_SURNAMES) + rng.choice(_SIM_GIVEN)
+        phone = f"010{rng.randrange(10 ** 8):08d}"
+        row["parent_phone"] = phone[1:] if rng.random() < 0.3 else phone  # 앞자리 0 빠진 숫자 입력 흉내
+        row["student_phone"] = f"010{rng.randrange(10 ** 8):08d}"
+        for course, options in _SIM_OPTIONS.items():
+            row[course] = ", ".join(rng.sample(options, rng.randint(0, min(max_per_course, len(options)))))
+        rows.append([row[key] for key in ApplyChecker.COLUMNS])
+    return rows
+
+
+def 시뮬레이션실행(source: str = "1000", cycles: int = 3):
+    """오프라인 리허설 - 로컬 시트 + 가짜 알리고/결제선생으로 check_and_send 반복 실행 후 소요 시간 보고
+    
+    source: 행 수(가짜 시트 생성) 또는 CSV/XLSX 파일 경로 (원본은 복사해서 사용)
+    """
+    work_dir = tempfile.mkdtemp(prefix="apply_sim_")
+    if source.isdigit():
+        sheet_path = os.path.join(work_dir, "sheet.csv")
+        LocalSheet.create(sheet_path, generate_sample_rows(int(source)))
+    else:
+        sheet_path = os.path.join(work_dir, os.path.basename(source))
+        shutil.copy(source, sheet_path)
+    
+    server = FakeBackendServer().start()
+    sheet = LocalSheet(sheet_path)
+    checker = ApplyChecker(
+        sheet=sheet,
+        row_state_path=os.path.join(work_dir, "row_state.json"),
+        journal_path=os.path.join(work_dir, "outbox.db"),
+        aligo_url=server.url,
+        payssam_url=server.url,
+    )
+    checker.metrics = MetricsExporter(jsonl_path=os.path.join(work_dir, "metrics.jsonl"))
+    checker.payssam.bill_ids = BillIdAllocator(os.path.join(work_dir, "bill_seq.json"))  # 운영용 카운터와 분리
+    
+    logger.info("=" * 50)
+    logger.info("🧪 시뮬레이션")
+    logger.info(f"   시트: {sheet_path} ({len(sheet.get_values()) - 1}행)")
+    logger.info(f"   가짜 API 지연 {server.latency * 1000:.0f}ms / 실패율 {server.error_rate:.1%}"
+                f"{f' / 할당량 초당 {server.quota:.0f}회' if server.quota else ''}")
+    logger.info("=" * 50)
+    sheet.take_calls()
+    
+    report = []
+    try:
+        for cycle in range(1, cycles + 1):
+            started = time.perf_counter()
+            results = checker.check_and_send()
+            elapsed = time.perf_counter() - started
+            report.append((cycle, elapsed, results, server.take_calls(), sheet.take_calls()))
+    finally:
+        server.stop()
+    
+    logger.info("=" * 50)
+    logger.info("🧪 시뮬레이션 결과")
+    for cycle, elapsed, results, api_calls, sheet_calls in report:
+        sms = results["sms"] or {"success": 0, "fail": 0}
+        bill = results["bill"] or {"success": 0, "fail": 0}
+        logger.info(f"  사이클 {cycle}: {elapsed:.2f}초 - 문자 {sms['success']}/{sms['success'] + sms['fail']}건, "
+                    f"청구서 {bill['success']}/{bill['success'] + bill['fail']}건, "
+                    f"API {sum(api_calls.values())}회, 시트 읽기 {sheet_calls['read']}회/쓰기 {sheet_calls['write']}회")
+    logger.info(f"  작업 폴더: {work_dir} (사이클 지표: metrics.jsonl)")
+    logger.info("=" * 50)
+    return report
+
+
+if __name__ == "__main__":
+    시뮬레이션실행(
+        source=sys.argv[1] if len(sys.argv) > 1 else "1000",
+        cycles=int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+    )
@@ -0,0 +1,33 @@
+"""시트 헤더 변경 - 대기 중인 셀 기록이 새 열 위치로 옮겨지는지 확인"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import apply_checker as ac
+import simulate as sim
+
+
+def test_pending_writes_follow_moved_columns(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sheet = sim.LocalSheet.create(str(tmp_path / "sheet.csv"), sim.generate_sample_rows(3, seed=1))
+    checker = ac.ApplyChecker(
+        sheet=sheet,
+        row_state_path=str(tmp_path / "row_state.json"),
+        journal_path=str(tmp_path / "outbox.db"),
+        metrics_path=str(tmp_path / "metrics.jsonl"),
+        metrics_prom_path=str(tmp_path / "metrics.prom"),
+    )
+    old_col = checker.col_index["sms_sent"]
+    checker._update_cell(2, "sms_sent", "기록")
+
+    # 기록 전에 누군가 맨 앞에 열을 끼워 넣음
+    sheet._rows = [["메모"] + row for row in sheet._rows]
+    before = list(sheet._rows[1])
+    checker._refresh_column_index(sheet.row_values(1))
+    checker.flush_writes()
+
+    assert checker.col_index["sms_sent"] == old_col + 1
+    assert sheet._rows[1][old_col] == "기록"
+    assert sheet._rows[1][old_col - 1] == before[old_col - 1]  # 예전 위치(이제 다른 항목)는 그대로
@@ -0,0 +1,262 @@
+"""저널 복구 - 가짜 알리고/결제선생 서버로 중단/타임아웃/거절 뒤 다음 사이클이 중복 발송하지 않는지 확인"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import apply_checker as ac
+import simulate as sim
+
+ROWS = 4
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sim.LocalSheet.create(str(tmp_path / "sheet.csv"), sim.generate_sample_rows(ROWS, seed=3, max_per_course=2))
+    server = sim.FakeBackendServer(latency=0, error_rate=0, seed=0).start()
+    yield server
+    server.stop()
+
+
+def make_checker(tmp_path, server, timeout: float = None) -> ac.ApplyChecker:
+    """같은 tmp_path의 시트/저널을 쓰는 새 프로세스 흉내"""
+    checker = ac.ApplyChecker(
+        sheet=sim.LocalSheet(str(tmp_path / "sheet.csv")),
+        row_state_path=str(tmp_path / "row_state.json"),
+        journal_path=str(tmp_path / "outbox.db"),
+        aligo_url=server.url,
+        payssam_url=server.url,
+        governor=ac.RateGovernor({backend: (1e9, 1e9, None) for backend in ac.RateGovernor.DEFAULT_LIMITS}),
+        metrics_path=str(tmp_path / "metrics.jsonl"),
+        metrics_prom_path=str(tmp_path / "metrics.prom"),
+    )
+    checker.payssam.bill_ids = ac.BillIdAllocator(str(tmp_path / "bill_seq.json"))
+    if timeout:
+        # 응답을 기다리다 끊기는 상황 (재시도 없음)
+        checker.transport = ac.HttpTransport(read_timeout=timeout, retries=0)
+        checker.payssam.transport = checker.transport
+    checker._snapshot = checker._fetch_applicants()
+    return checker
+
+
+def pending(tmp_path, server):
+    """시트 기준 남은 (문자, 청구서) 항목 수"""
+    applicants = make_checker(tmp_path, server)._snapshot
+    return (sum(len(app.get_pending_sms_items()) for app in applicants),
+            sum(len(app.get_bill_ready_items()) for app in applicants))
+
+
+def statuses(checker) -> list:
+    return sorted(entry.status for entry in checker.journal.unfinished())
+
+
+def test_crash_before_flush_replays_without_resending(tmp_path, server):
+    checker = make_checker(tmp_path, server)
+    items, _ = pending(tmp_path, server)
+    assert items
+    checker.send_registration_sms(checker._snapshot)
+    checker.send_bills(checker.get_bill_pending_applicants())
+    checker.writes._pending.clear()  # 시트 기록 전에 죽음
+    assert pending(tmp_path, server)[0] == items
+    sent = server.take_calls()
+
+    make_checker(tmp_path, server).check_and_send()
+    calls = server.take_calls()
+    assert calls.get("/send_mass/", 0) == 0
+    assert calls.get("/if/bill/send", 0) == 0  # 'sent'는 재확인 없이 시트만 기록
+    assert pending(tmp_path, server) == (0, 0)
+    assert len(server._bills) == sent["/if/bill/send"]
+
+
+def test_bill_timeout_replays_with_same_bill_id(tmp_path, server):
+    checker = make_checker(tmp_path, server)
+    checker.send_registration_sms(checker._snapshot)
+    checker.flush_writes()
+
+    checker = make_checker(tmp_path, server, timeout=0.3)
+    server.stall["/if/bill/send"] = 1.0
+    results = checker.send_bills(checker.get_bill_pending_applicants())
+    server.stall.clear()
+    assert results["success"] == 0
+    assert set(statuses(checker)) == {"unknown"}
+    bills = set(server._bills)  # 서버는 처리했지만 응답을 못 받음
+    assert len(bills) == results["fail"]
+
+    server.take_calls()
+    retry = make_checker(tmp_path, server)
+    retry.check_and_send()
+    assert server._bills == bills  # 새 bill_id로 두 번째 청구서를 보내지 않음
+    assert server.take_calls().get("/if/bill/send", 0) == 0  # 조회로 확인, 재발송 없음
+    assert statuses(retry) == []
+    recorded = {record.bill_id for app in make_checker(tmp_path, server)._snapshot for record in app.get_bill_records().values()}
+    assert recorded == bills
+    assert pending(tmp_path, server) == (0, 0)
+
+
+def test_lost_bill_is_resent_with_same_bill_id(tmp_path, server):
+    checker = make_checker(tmp_path, server)
+    checker.send_registration_sms(checker._snapshot)
+    checker.flush_writes()
+
+    checker = make_checker(tmp_path, server, timeout=0.3)
+    server.stall["/if/bill/send"] = 1.0
+    checker.send_bills(checker.get_bill_pending_applicants())
+    server.stall.clear()
+    journaled = {entry.ref for entry in checker.journal.unfinished()}
+    lost = sorted(journaled)[0]
+    server._bills.discard(lost)  # 결제선생에 닿지 않은 요청
+
+    # 조회도 응답이 없으면 보류 (재발송 없음)
+    server.stall["/if/bill/read"] = 1.0
+    held = make_checker(tmp_path, server, timeout=0.3)
+    held._replay_journal(held._snapshot)
+    server.stall.clear()
+    assert set(statuses(held)) == {"unknown"}
+    assert lost not in server._bills
+
+    server.duplicate_code = "7777"  # 거절 코드와 무관하게 동작
+    retry = make_checker(tmp_path, server)
+    retry.check_and_send()
+    assert server._bills == journaled  # 없던 것만 같은 bill_id로 다시 발송
+    assert statuses(retry) == []
+    assert pending(tmp_path, server) == (0, 0)
+
+
+def test_sms_timeout_checks_sms_list_before_resending(tmp_path, server):
+    checker = make_checker(tmp_path, server, timeout=0.3)
+    server.stall["/send_mass/"] = 1.0
+    results = checker.send_registration_sms(checker._snapshot)
+    server.stall.clear()
+    assert results["success"] == 0
+    assert set(statuses(checker)) == {"unknown"}
+    server.take_calls()
+
+    # 전송 내역을 읽을 수 없으면 그대로 보류 (재발송 없음)
+    server.reject.add("/list/")
+    held = make_checker(tmp_path, server)
+    held.check_and_send()
+    server.reject.clear()
+    assert server.take_calls().get("/send_mass/", 0) == 0
+    assert set(statuses(held)) == {"unknown"}
+
+    resolved = make_checker(tmp_path, server)
+    resolved.check_and_send()
+    calls = server.take_calls()
+    assert calls.get("/send_mass/", 0) == 0
+    assert calls["/sms_list/"] >= 1
+    assert statuses(resolved) == []
+    assert pending(tmp_path, server) == (0, 0)
+
+
+def test_backend_rejection_is_failed_and_resent(tmp_path, server):
+    checker = make_checker(tmp_path, server)
+    items, _ = pending(tmp_path, server)
+    server.reject.add("/send_mass/")
+    results = checker.send_registration_sms(checker._snapshot)
+    assert results == {"success": 0, "fail": items}
+    assert statuses(checker) == []  # failed는 미완료가 아님
+    server.reject.clear()
+    server.take_calls()
+
+    make_checker(tmp_path, server).check_and_send()
+    calls = server.take_calls()
+    assert calls["/send_mass/"] >= 1
+    assert calls.get("/list/", 0) == calls.get("/sms_list/", 0) == 0
+    assert pending(tmp_path, server) == (0, 0)
+
+
+def test_partial_failure_with_unreadable_sms_list_resends_only_failed(tmp_path, server):
+    checker = make_checker(tmp_path, server)
+    server.error_rate = 0.5
+    server.reject.add("/sms_list/")
+    checker.send_registration_sms(checker._snapshot)
+    server.error_rate = 0
+    server.reject.clear()
+    failed = sum(fail for deliveries in server._deliveries.values() for fail in deliveries.values())
+    delivered = sum(not fail for deliveries in server._deliveries.values() for fail in deliveries.values())
+    assert failed and delivered
+    assert "unknown" in statuses(checker)
+
+    retry = make_checker(tmp_path, server)
+    retry._replay_journal(retry._snapshot)
+    retry.flush_writes()
+    assert statuses(retry) == []
+    resent = make_checker(tmp_path, server)
+    assert sum(len(app.get_pending_sms_items()) for app in resent._snapshot) == failed
+
+    server.take_calls()
+    resent.send_registration_sms(resent._snapshot)
+    assert sum(len(server._deliveries[mid]) for mid in server._deliveries) == failed + delivered + failed
+
+
+def test_adjust_timeout_replays_destroy_then_same_bill_id(tmp_path, server):
+    make_checker(tmp_path, server).check_and_send()
+    checker = make_checker(tmp_path, server)
+    app = next(app for app in checker._snapshot if app.get_existing_bill_ids())
+    old_bill_ids = set(app.get_existing_bill_ids().values())
+    checker._update_cell(app.row_num, "price_adjustment", "-10000")
+    checker.flush_writes()
+
+    checker = make_checker(tmp_path, server, timeout=0.3)
+    server.stall["/if/bill/send"] = 1.0
+    results = checker.send_adjusted_bills()
+    server.stall.clear()
+    assert results["success"] == 0
+    assert {entry.payload["old_bill_id"] for entry in checker.journal.unfinished()} == old_bill_ids
+    bills = set(server._bills)
+    assert make_checker(tmp_path, server).get_price_adjustment_applicants()  # 결과 확인 전에는 셀 유지
+
+    retry = make_checker(tmp_path, server)
+    retry.check_and_send()
+    assert server._bills == bills  # 조정 청구서를 새 bill_id로 또 보내지 않음
+    assert statuses(retry) == []
+    after = make_checker(tmp_path, server)
+    assert not after.get_price_adjustment_applicants()
+    row = next(a for a in after._snapshot if a.row_num == app.row_num)
+    new_bill_ids = set(row.get_existing_bill_ids().values())
+    assert new_bill_ids and new_bill_ids <= bills - old_bill_ids
+
+
+def test_sms_error_cancels_started_bill_tasks(tmp_path, server):
+    make_checker(tmp_path, server).send_registration_sms([])
+    checker = make_checker(tmp_path, server)
+    first = checker._snapshot[0]
+    checker.send_registration_sms([first])
+    checker.flush_writes()
+
+    checker = make_checker(tmp_path, server)
+    server.stall["/if/bill/send"] = 0.5
+
+    async def broken_sms(applicants, on_recorded=None):
+        await asyncio.sleep(0.05)
+        raise RuntimeError("문자 발송 중 오류")
+
+    async def run():
+        checker.send_registration_sms_async = broken_sms
+        with pytest.raises(RuntimeError):
+            await checker._send_all_async()
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert checker.runner.run(run()) == []  # 청구서 작업이 루프에 남지 않음
+    server.stall.clear()
+
+
+def test_cycle_error_closes_chunk_stream(tmp_path, server):
+    checker = make_checker(tmp_path, server)
+    checker.chunk_rows = 2  # 첫 구간 발송 중 다음 구간 미리 조회
+
+    async def broken_send():
+        raise RuntimeError("발송 중 오류")
+
+    async def run():
+        checker._send_all_async = broken_send
+        with pytest.raises(RuntimeError):
+            await checker._run_chunks_async(ac.CycleMetrics(), {"sms": None, "bill": None})
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert checker.runner.run(run()) == []
@@ -0,0 +1,29 @@
+"""사이클 지표 파일 - 크기를 넘으면 돌리고 보관 개수만 남기는지 확인"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import apply_checker as ac
+
+
+def cycle(n: int) -> dict:
+    return {"cycle": n, "duration": 0.1, "stages": {}, "rows": {}, "queue": {}, "rates": {}, "results": {}, "api": {}}
+
+
+def test_metrics_jsonl_rotates_by_size(tmp_path):
+    path = str(tmp_path / "metrics.jsonl")
+    line = len(json.dumps(cycle(0)).encode()) + 1
+    exporter = ac.MetricsExporter(jsonl_path=path, max_bytes=line * 3, backups=2)
+    for n in range(10):
+        exporter.export(cycle(n))
+
+    assert sorted(os.listdir(tmp_path)) == ["metrics.jsonl", "metrics.jsonl.1", "metrics.jsonl.2"]
+    for name in os.listdir(tmp_path):
+        assert os.path.getsize(tmp_path / name) <= line * 3
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(row)["cycle"] for row in f] == [9]
+    with open(f"{path}.1", encoding="utf-8") as f:
+        assert [json.loads(row)["cycle"] for row in f] == [6, 7, 8]
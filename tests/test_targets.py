@@ -0,0 +1,51 @@
+"""여러 시트 동시 실행 - 대상별 지표에 다른 대상의 API 호출이 섞이지 않는지 확인"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import apply_checker as ac
+import simulate as sim
+
+
+def make_target(tmp_path, server, name: str, rows: int) -> ac.ApplyChecker:
+    target_dir = tmp_path / name
+    target_dir.mkdir()
+    sim.LocalSheet.create(str(target_dir / "sheet.csv"), sim.generate_sample_rows(rows, seed=2))
+    checker = ac.ApplyChecker(
+        sheet=sim.LocalSheet(str(target_dir / "sheet.csv")),
+        name=name,
+        row_state_path=str(target_dir / "row_state.json"),
+        journal_path=str(target_dir / "outbox.db"),
+        aligo_url=server.url,
+        payssam_url=server.url,
+        governor=ac.RateGovernor({backend: (1e9, 1e9, None) for backend in ac.RateGovernor.DEFAULT_LIMITS}),
+        metrics_path=str(target_dir / "metrics.jsonl"),
+        metrics_prom_path=str(target_dir / "metrics.prom"),
+    )
+    checker.payssam.bill_ids = ac.BillIdAllocator(str(target_dir / "bill_seq.json"))
+    return checker
+
+
+def test_call_stats_are_per_target(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = sim.FakeBackendServer(latency=0, error_rate=0).start()
+    try:
+        busy = make_target(tmp_path, server, "busy", 5)
+        empty = make_target(tmp_path, server, "empty", 0)
+        assert busy.transport._sessions is empty.transport._sessions  # 연결 풀은 공용
+
+        # busy 대상의 발송이 진행 중일 때 empty 대상의 사이클이 끝남
+        busy._snapshot = busy._fetch_applicants()
+        busy.send_registration_sms(busy._snapshot)
+        empty.check_and_send()
+        assert not any(endpoint.endswith("/send_mass/") for endpoint in empty.metrics.last["api"])
+
+        busy._snapshot = None
+        busy.check_and_send()
+        assert any(endpoint.endswith("/send_mass/") for endpoint in busy.metrics.last["api"])
+        with open(tmp_path / "empty" / "metrics.prom", encoding="utf-8") as f:
+            assert "/send_mass/" not in f.read()
+    finally:
+        server.stop()
@@ -0,0 +1,71 @@
+"""HTTP 전송 - 서버에 닿지 않은 요청만 재시도하고, 청구서 발송은 응답 타임아웃에 다시 보내지 않는지 확인"""
+
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import apply_checker as ac
+import simulate as sim
+
+
+def test_dns_failure_counts_as_not_sent():
+    transport = ac.HttpTransport(retries=1, backoff=0)
+    with pytest.raises(requests.ConnectionError) as error:
+        transport.post("http://apply-checker.invalid/send/", data={})
+    assert ac.HttpTransport._not_sent(error.value)
+    stats = transport.stats.take()["apply-checker.invalid/send/"]
+    assert stats["count"] == 2  # 비멱등 요청이어도 1회 재시도
+
+
+def test_bill_send_is_not_reposted_after_read_timeout():
+    server = sim.FakeBackendServer(latency=0, error_rate=0).start()
+    try:
+        server.stall["/if/bill/send"] = 1.0
+        payssam = ac.PaySsamAPI(transport=ac.HttpTransport(read_timeout=0.3, retries=2, backoff=0), base_url=server.url)
+        result = payssam.send_bill("T0001", "상품", "안내", "학생", "01012345678", "1000")  # 예전 위치 인자 호출 그대로
+        assert not result.success and not result.code  # 결과 불명 → 저널 복구가 확인
+        assert server.take_calls()["/if/bill/send"] == 1
+    finally:
+        server.stop()
+
+
+def test_payssam_and_drive_calls_go_through_governor():
+    assert ac.PaySsamAPI().limiter is ac.GOVERNOR["payssam"]
+
+    class DriveSession(requests.Session):
+        def request(self, method, url, **kwargs):
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'{"modifiedTime": "2026-10-17T00:00:00Z"}'
+            return response
+
+    class CountingLimiter(ac.AdaptiveRateLimiter):
+        acquired = 0
+
+        def acquire(self):
+            CountingLimiter.acquired += 1
+
+    transport = ac.HttpTransport()
+    limiter = CountingLimiter(10, 10)
+    modified = ac.fetch_modified_time("SHEET", session=DriveSession(), transport=transport, limiter=limiter)
+    assert modified == "2026-10-17T00:00:00Z"
+    assert CountingLimiter.acquired == 1
+    assert [stat["count"] for stat in transport.stats.take().values()] == [1]
+
+
+def test_single_sms_accepts_plain_text(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sim.LocalSheet.create(str(tmp_path / "sheet.csv"), sim.generate_sample_rows(1))
+    server = sim.FakeBackendServer(latency=0, error_rate=0).start()
+    try:
+        checker = ac.ApplyChecker(sheet=sim.LocalSheet(str(tmp_path / "sheet.csv")), row_state_path=str(tmp_path / "row_state.json"),
+                                  journal_path=str(tmp_path / "outbox.db"), aligo_url=server.url, payssam_url=server.url,
+                                  metrics_path="")
+        assert checker._send_sms("01012345678", "신청 확인 시스템 시작").success
+        assert checker._send_sms("01012345678", "긴 안내 " * 30).success
+    finally:
+        server.stop()